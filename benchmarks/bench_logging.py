@@ -0,0 +1,82 @@
+"""
+Logging cost per crawled page, as seen by the thread doing the crawling.
+
+Each page logs the two per-page INFO events of iter_product_pages plus one
+DEBUG event (filtered out at INFO), written to a real file.
+
+Run from the project root:
+    python -m benchmarks.bench_logging [pages]
+"""
+import logging
+import os
+import sys
+import tempfile
+import timeit
+
+from utils import log
+from utils.log import SAMPLED
+
+URL = 'https://fashion-studio.dicoding.dev'
+logger = logging.getLogger('bench.extract')
+
+
+def pages_eager(pages):
+    for page_num in range(pages):
+        logger.info(f"Fetching page {page_num}: {URL}/page{page_num}")
+        logger.info(f"Extracted {20} products from page {page_num}")
+        logger.debug("Page URL: {}".format(f"{URL}/page{page_num}"))
+
+
+def pages_lazy(pages):
+    for page_num in range(pages):
+        logger.info("Fetching page %d: %s/page%d", page_num, URL, page_num, extra=SAMPLED)
+        logger.info("Extracted %d products from page %d", 20, page_num, extra=SAMPLED)
+        logger.debug("Page URL: %s/page%d", URL, page_num)
+
+
+def reset_root():
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+
+
+def measure(run, pages, setup):
+    def once():
+        setup()
+        try:
+            return timeit.timeit(lambda: run(pages), number=1)
+        finally:
+            log.shutdown_logging()
+            reset_root()
+    return min(once() for _ in range(5)) / pages * 1e6
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    fd, path = tempfile.mkstemp(suffix='.log')
+    os.close(fd)
+    try:
+        def sync_handler():
+            # What every module's logging.basicConfig used to set up.
+            logging.basicConfig(filename=path, level=logging.INFO, force=True,
+                                format=log.TEXT_FORMAT)
+
+        def queued(sample_every, log_format='text'):
+            def setup():
+                stream = open(path, 'a', encoding='utf-8')
+                log.setup_logging(logging.INFO, log_format, sample_every, stream=stream)
+            return setup
+
+        print(f"pages: {pages}")
+        print(f"sync, f-strings:          {measure(pages_eager, pages, sync_handler):6.2f} us/page")
+        print(f"sync, lazy:               {measure(pages_lazy, pages, sync_handler):6.2f} us/page")
+        print(f"queue, lazy:              {measure(pages_lazy, pages, queued(1)):6.2f} us/page")
+        print(f"queue, lazy, json:        {measure(pages_lazy, pages, queued(1, 'json')):6.2f} us/page")
+        print(f"queue, lazy, 1-in-10:     {measure(pages_lazy, pages, queued(10)):6.2f} us/page")
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Per-card field parsing cost (price, rating, colors), plus whole-column parsing,
+for the original split/replace parsers and the memoized/vectorized ones.
+
+Run from the project root:
+    python -m benchmarks.bench_parsers [cards]
+"""
+import random
+import sys
+import timeit
+
+import pandas as pd
+
+from utils import extract, transform
+
+
+# The parsers as they were before the regex/memoization work (5eb5a3d).
+def baseline_parse_price(price_text):
+    try:
+        price_text = price_text.replace('$', '').replace(',', '').strip()
+        return float(price_text)
+    except Exception:
+        return None
+
+
+def baseline_parse_rating(detail_text):
+    try:
+        rating_text = detail_text.split('⭐')[1].split('/')[0].strip()
+        return None if rating_text == 'Invalid Rating' else float(rating_text)
+    except Exception:
+        return None
+
+
+def baseline_parse_colors(detail_text):
+    try:
+        return int(detail_text.split()[0])
+    except Exception:
+        return None
+
+
+def raw_fields(count, seed=0):
+    rng = random.Random(seed)
+    cards = []
+    for _ in range(count):
+        rating = rng.choice(['Invalid Rating', 'Not Rated'] +
+                            [f"{r / 10:.1f}" for r in range(10, 50)])
+        # Built at runtime so each card holds its own string objects.
+        cards.append((
+            f"${rng.randint(10, 500)}.{rng.randint(0, 99):02d}",
+            f"Rating: ⭐ {rating} / 5",
+            f"{rng.randint(1, 8)} Colors",
+        ))
+    return cards
+
+
+def parse_cards_baseline(cards):
+    for price, rating, colors in cards:
+        baseline_parse_price(price)
+        baseline_parse_rating(rating)
+        baseline_parse_colors(colors)
+
+
+def parse_cards(cards):
+    for price, rating, colors in cards:
+        extract.parse_price(price)
+        extract.parse_rating(rating)
+        extract.parse_colors(colors)
+
+
+def best(run, count):
+    return min(timeit.repeat(run, number=1, repeat=5)) / count * 1e6
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    cards = raw_fields(count)
+    prices, ratings, colors = (pd.Series(col) for col in zip(*cards))
+
+    def parse_columns_baseline():
+        prices.map(baseline_parse_price)
+        ratings.map(baseline_parse_rating)
+        colors.map(baseline_parse_colors)
+
+    def parse_columns():
+        transform.parse_price_column(prices)
+        transform.parse_rating_column(ratings)
+        transform.parse_colors_column(colors)
+
+    extract.parse_rating.cache_clear()
+    extract.parse_colors.cache_clear()
+    print(f"cards: {count}")
+    print(f"per-card parse, baseline: {best(lambda: parse_cards_baseline(cards), count):6.2f} us/card")
+    print(f"per-card parse, memoized: {best(lambda: parse_cards(cards), count):6.2f} us/card")
+    print(f"column parse, baseline:   {best(parse_columns_baseline, count):6.2f} us/card")
+    print(f"column parse, vectorized: {best(parse_columns, count):6.2f} us/card")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Memory per extracted product: plain dicts vs. the slotted, interned Product.
+
+Run from the project root:
+    python -m benchmarks.bench_product_memory [count]
+"""
+import sys
+import tracemalloc
+
+from utils.product import Product
+
+SIZES = ['S', 'M', 'L', 'XL', 'XXL']
+GENDERS = ['Men', 'Women', 'Unisex']
+
+
+def raw_product(i):
+    # Build every string at runtime, like BeautifulSoup's .text/.strip() does,
+    # so equal values are separate objects exactly as in a real crawl.
+    title = f"T-shirt {i % 5000}"
+    return {
+        'image_url': f"https://fashion-studio.dicoding.dev/static/images/products/{i}.jpg",
+        'product_alt': f"T-shirt {i % 5000}",
+        'title': title,
+        'price': 100.0 + i % 400,
+        'rating': 3.0 + (i % 20) / 10,
+        'colors': 1 + i % 5,
+        'size': ''.join(SIZES[i % len(SIZES)]),
+        'gender': f"{GENDERS[i % len(GENDERS)]} ".strip(),
+    }
+
+
+def measure(build, count):
+    tracemalloc.start()
+    items = [build(i) for i in range(count)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del items
+    return current / count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    as_dict = measure(raw_product, count)
+    as_product = measure(lambda i: Product.from_dict(raw_product(i)), count)
+    print(f"products: {count}")
+    print(f"dict:     {as_dict:8.1f} bytes/product")
+    print(f"Product:  {as_product:8.1f} bytes/product "
+          f"({100 * (1 - as_product / as_dict):.0f}% less)")
+
+
+if __name__ == '__main__':
+    main()
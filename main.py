@@ -1,37 +1,246 @@
 import argparse
+import functools
+import json
 import logging
+import os
+import signal
+import threading
 import time
-import traceback
+from datetime import datetime
+
+import requests
 from dotenv import load_dotenv
 
-from utils.extract import extract_all_products
-from utils.transform import transform_data
-from utils.load import load_data
+from utils.extract import (extract_all_products, iter_product_pages,
+                           set_http_session)
+from utils.scheduler import (build_sources, crawl_sources, iter_crawl_pages,
+                             load_crawl_config)
+from utils.transform import fill_missing, transform_data
+from utils.load import (LOAD_MODES, LoadStream,
+                        get_google_sheets_service_from_env, load_data,
+                        primary_sink, save_quarantine)
+from utils.service import RunState, parse_duration, serve, start_health_server
+from utils.validate import validate_data
+from utils.db import PostgresPool
+from utils.dedup import DedupIndex
+from utils.archive import (ArchiveReader, PageArchive, extract_archived_products,
+                           iter_archived_pages)
+from utils.spill import OutOfCoreTransform, parse_size
+from utils.enrich import DEFAULT_WORKERS, ImageCache, enrich_images
+from utils.log import (DEFAULT_SAMPLE_EVERY, LOG_FORMATS, set_run_id,
+                       set_stage, setup_logging, shutdown_logging)
 
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_URL = 'https://fashion-studio.dicoding.dev'
+
+
+def create_pool(size=None):
+    try:
+        return PostgresPool.from_env(size)
+    except Exception as e:
+        logger.warning(
+            f"PostgreSQL pool unavailable, falling back to per-load connections: {e}")
+        return None
+
+
+def ensure_partitions(pool):
+    if pool is None or not pool.partitioned:
+        return
+    try:
+        pool.ensure_partitions()
+    except Exception as e:
+        logger.error(f"Creating monthly partitions failed: {e}")
+
+
+def run_retention(pool, months: int):
+    if pool is None or not pool.partitioned:
+        logger.warning(
+            "Retention skipped: requires a PostgreSQL pool with DB_PARTITIONING=monthly")
+        return
+    try:
+        pool.drop_expired_partitions(months)
+    except Exception as e:
+        logger.error(f"Retention job failed: {e}")
+
+
+def validate_stage(data, report, stream=None):
+    """
+    Drop and quarantine invalid rows, then fill the gaps in the valid ones.
+    Counts add up across streamed parts.
+    """
+    set_stage('validate')
+    data, quarantined, rule_counts = validate_data(data)
+    validation = report.setdefault(
+        'validation', {'rows_valid': 0, 'rows_quarantined': 0, 'rules': {}})
+    validation['rows_valid'] += len(data)
+    validation['rows_quarantined'] += len(quarantined)
+    for name, count in rule_counts.items():
+        validation['rules'][name] = validation['rules'].get(name, 0) + count
+    if not quarantined.empty and not save_quarantine(quarantined, stream):
+        logger.warning("Failed to save quarantined rows")
+    return fill_missing(data)
+
+
+def load_stage(data, pool=None, dedup_index=None, sheets_service=None,
+               report=None, stream=None, enrich=None, load_mode='snapshot'):
+    """
+    Skip rows loaded by earlier runs, enrich the rest and load them into every sink.
+
+    Rows are recorded in the dedup index once the primary store has them
+    (PostgreSQL, or the CSV file when PostgreSQL is not configured), even if
+    Google Sheets or another secondary sink failed: re-sending them next run
+    would duplicate them in the primary store, so secondary sinks miss them
+    instead. Returns True only if every sink succeeded.
+    """
+    set_stage('load')
+    if dedup_index is not None:
+        rows_before = len(data)
+        data, new_hashes = dedup_index.filter_new(data)
+        report['rows_already_seen'] = \
+            report.get('rows_already_seen', 0) + rows_before - len(data)
+        if data.empty:
+            logger.info("No new rows since previous runs, nothing to load.")
+            return True
+
+    if enrich is not None:
+        data = enrich(data, report=report)
+
+    sinks = {}
+    success = load_data(data, pool=pool, sheets_service=sheets_service,
+                        stream=stream, load_mode=load_mode, report=report,
+                        sinks=sinks)
+    if sinks.get(primary_sink(pool)):
+        report['rows_loaded'] = report.get('rows_loaded', 0) + len(data)
+        if dedup_index is not None:
+            dedup_index.add(new_hashes)
+    return success
+
+
+def iter_extracted_pages(base_url, max_pages, sources=None, host_budgets=None,
+                         archive=None, replay=None):
+    """Yield the products of each extracted page, from whichever source the run uses."""
+    if replay is not None:
+        yield from iter_archived_pages(replay)
+    elif sources:
+        for _, _, products in iter_crawl_pages(sources, host_budgets, archive):
+            yield products
+    else:
+        yield from iter_product_pages(base_url, max_pages, archive)
+
+
+def transform_and_load_out_of_core(pages, memory_limit, spill_dir=None,
+                                   pool=None, dedup_index=None, validate=True,
+                                   sheets_service=None, report=None,
+                                   enrich=None, load_mode='snapshot',
+                                   timestamp=None) -> bool:
+    """
+    Spill extracted pages to disk and load them back partition by partition,
+    so peak memory stays around `memory_limit` however large the crawl is.
+    """
+    stream = LoadStream()
+    success = True
+    with OutOfCoreTransform(memory_limit, spill_dir,
+                            keep_image_url=enrich is not None,
+                            fill=not validate, timestamp=timestamp) as spill:
+        set_stage('extract')
+        for products in pages:
+            spill.add(products)
+        spill.flush()
+        report['rows_extracted'] = spill.rows_extracted
+        if not spill.rows_extracted:
+            logger.error("Extraction failed: No data extracted")
+
+        report['rows_transformed'] = 0
+        report['partitions'] = 0
+        set_stage('transform')
+        for part in spill.partitions():
+            report['partitions'] += 1
+            report['rows_transformed'] += len(part)
+            if validate:
+                part = validate_stage(part, report, stream)
+                if part.empty:
+                    continue
+            if not load_stage(part, pool, dedup_index, sheets_service,
+                              report, stream, enrich, load_mode):
+                logger.warning("Issues loading partition %d", report['partitions'])
+                success = False
+            set_stage('transform')
+
+    if not report['rows_transformed']:
+        logger.error("Transformation failed: No valid data after transformation")
+        return False
+    if validate and not report['validation']['rows_valid']:
+        logger.error("Validation failed: every row was quarantined")
+        return False
+    return success
+
 
-def etl_pipeline(base_url: str, max_pages: int) -> bool:
+def etl_pipeline(base_url: str, max_pages: int, sources=None,
+                 host_budgets=None, pool=None, dedup_index=None,
+                 archive=None, replay=None, validate=True,
+                 sheets_service=None, report=None, memory_limit=None,
+                 spill_dir=None, enrich=None, load_mode='snapshot') -> bool:
     start_time = time.time()
-    logger.info(f"Starting ETL pipeline for {base_url} with {max_pages} pages")
+    report = {} if report is None else report
+    # Replayed rows keep the time their pages were fetched, not the replay's.
+    timestamp = replay.fetched_at if replay is not None else None
+    if replay is not None:
+        logger.info(f"Replaying archived run {replay.run_id} ({len(replay)} pages)")
+    elif sources:
+        logger.info(f"Starting ETL pipeline for {len(sources)} sources")
+    else:
+        logger.info(
+            f"Starting ETL pipeline for {base_url} with {max_pages} pages")
 
     try:
-        raw_data = extract_all_products(base_url, max_pages)
+        set_stage('extract')
+        if memory_limit:
+            pages = iter_extracted_pages(base_url, max_pages, sources,
+                                         host_budgets, archive, replay)
+            success = transform_and_load_out_of_core(
+                pages, memory_limit, spill_dir, pool=pool,
+                dedup_index=dedup_index, validate=validate,
+                sheets_service=sheets_service, report=report, enrich=enrich,
+                load_mode=load_mode, timestamp=timestamp)
+            if success:
+                logger.info("Data successfully loaded.")
+            return success
+
+        if replay is not None:
+            raw_data = extract_archived_products(replay)
+        elif sources:
+            raw_data = crawl_sources(sources, host_budgets, archive)
+        else:
+            raw_data = extract_all_products(base_url, max_pages, archive)
+        report['rows_extracted'] = len(raw_data)
         if not raw_data:
             logger.error("Extraction failed: No data extracted")
-            logger.debug("URL: {}".format(base_url))
-            logger.debug("Max pages: {}".format(max_pages))
+            logger.debug("URL: %s", base_url)
+            logger.debug("Max pages: %s", max_pages)
 
-        transformed_data = transform_data(raw_data)
+        set_stage('transform')
+        # With validation on, gaps are filled only after the rules saw them.
+        transformed_data = transform_data(raw_data,
+                                          keep_image_url=enrich is not None,
+                                          fill=not validate,
+                                          timestamp=timestamp)
+        report['rows_transformed'] = len(transformed_data)
         if transformed_data.empty:
             logger.error(
                 "Transformation failed: No valid data after transformation")
             return False
 
-        load_success = load_data(transformed_data)
-        if load_success:
+        if validate:
+            transformed_data = validate_stage(transformed_data, report)
+            if transformed_data.empty:
+                logger.error("Validation failed: every row was quarantined")
+                return False
+
+        if load_stage(transformed_data, pool, dedup_index, sheets_service,
+                      report, enrich=enrich, load_mode=load_mode):
             logger.info("Data successfully loaded.")
             return True
         else:
@@ -40,20 +249,183 @@ def etl_pipeline(base_url: str, max_pages: int) -> bool:
 
     except Exception as e:
         logger.error(f"ETL pipeline failed: {e}")
-        logger.debug(traceback.format_exc())
+        logger.debug("ETL pipeline traceback", exc_info=True)
         return False
+    finally:
+        set_stage(None)
+        # Written once per run, after every partition, rather than per load.
+        if dedup_index is not None and dedup_index.dirty:
+            try:
+                dedup_index.save()
+            except Exception as e:
+                logger.error(f"Saving dedup index failed: {e}")
+        report['duration_seconds'] = round(time.time() - start_time, 3)
+        if archive is not None:
+            report['archive'] = {'run': archive.run_id, 'pages': archive.pages}
+        if pool is not None:
+            report['postgres_pool'] = pool.stats()
+        logger.info(f"Run report: {json.dumps(report)}")
+
+
+def serve_forever(run_once, interval, jitter, health_port=None):
+    stop_event = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop_event.set())
+
+    state = RunState()
+    server = None
+    if health_port is not None:
+        server = start_health_server(state, health_port)
+    logger.info(f"Serving: running every {interval:.0f}s (+0-{jitter:.0f}s jitter)")
+    try:
+        serve(run_once, interval, jitter, state=state, stop_event=stop_event)
+    finally:
+        if server is not None:
+            server.shutdown()
+    logger.info(f"Stopped after {state.runs} runs")
 
 
 def main():
     parser = argparse.ArgumentParser(
         description='Fashion Products ETL Pipeline')
-    parser.add_argument('--url', default='https://fashion-studio.dicoding.dev',
-                        help='Base URL of the fashion website')
+    parser.add_argument('--url', action='append', dest='urls',
+                        help='Base URL of a fashion website (repeat for several sources)')
     parser.add_argument('--pages', type=int, default=50,
                         help='Maximum number of pages to scrape')
+    parser.add_argument('--config',
+                        help='JSON crawl config with sources and per-host budgets')
+    parser.add_argument('--db-pool-size', type=int,
+                        help='Maximum PostgreSQL pool connections (default: DB_POOL_SIZE or 4)')
+    parser.add_argument('--retention-months', type=int,
+                        default=int(os.getenv('DB_RETENTION_MONTHS', '0')),
+                        help='Drop monthly partitions older than this many months after the run')
+    parser.add_argument('--dedup-index', default=os.getenv('DEDUP_INDEX_PATH'),
+                        help='File of row hashes used to skip rows loaded by earlier runs')
+    parser.add_argument('--archive-dir', default=os.getenv('ARCHIVE_DIR'),
+                        help='Directory where fetched pages are archived for later replay')
+    parser.add_argument('--replay', metavar='RUN',
+                        help="Re-run parse/transform/load from an archived run ('latest' for the newest)")
+    parser.add_argument('--no-validate', action='store_true',
+                        help='Skip row validation and quarantine')
+    parser.add_argument('--load-mode', choices=LOAD_MODES,
+                        default=os.getenv('LOAD_MODE', 'snapshot'),
+                        help='snapshot: append every run to fashion_products; '
+                             'cdc: keep product_current and record only changes in product_price_history')
+    parser.add_argument('--memory-limit', default=os.getenv('ETL_MEMORY_LIMIT'),
+                        help="Spill to disk and load in parts to stay under this much memory (e.g. '512M', '2G')")
+    parser.add_argument('--spill-dir', default=os.getenv('ETL_SPILL_DIR'),
+                        help='Directory for the temporary spill files of --memory-limit')
+    parser.add_argument('--enrich-images', action='store_true',
+                        help='Fetch product images and add their size, dimensions and perceptual hash')
+    parser.add_argument('--image-cache', default=os.getenv('IMAGE_CACHE_DIR'),
+                        help='Directory caching image metadata so images are fetched only once')
+    parser.add_argument('--image-workers', type=int, default=DEFAULT_WORKERS,
+                        help='Maximum concurrent image downloads')
+    parser.add_argument('--serve', action='store_true',
+                        help='Keep running and repeat the pipeline every --interval')
+    parser.add_argument('--interval', default='1h',
+                        help="Time between run starts in --serve mode (e.g. '1h', '30m')")
+    parser.add_argument('--jitter', default='0',
+                        help="Random extra delay added before each run (e.g. '5m')")
+    parser.add_argument('--health-port', type=int,
+                        help='Port for the local /health and /metrics endpoint in --serve mode')
+    parser.add_argument('--log-format', choices=LOG_FORMATS,
+                        default=os.getenv('LOG_FORMAT', 'text'),
+                        help='text, or json for one structured event per line with run and stage IDs')
+    parser.add_argument('--log-level', default=os.getenv('LOG_LEVEL', 'INFO'),
+                        help='Minimum level written to the log (e.g. DEBUG, INFO, WARNING)')
+    parser.add_argument('--log-sample-every', type=int,
+                        default=int(os.getenv('LOG_SAMPLE_EVERY', DEFAULT_SAMPLE_EVERY)),
+                        help='Write only every n-th per-page event (1 writes them all)')
     args = parser.parse_args()
 
-    success = etl_pipeline(args.url, args.pages)
+    urls = args.urls or [DEFAULT_URL]
+    if args.replay and not args.archive_dir:
+        parser.error('--replay requires --archive-dir (or ARCHIVE_DIR)')
+    if args.replay and args.serve:
+        parser.error('--replay cannot be combined with --serve')
+    if args.load_mode not in LOAD_MODES:
+        parser.error(f"invalid load mode {args.load_mode!r}, expected one of {', '.join(LOAD_MODES)}")
+    if args.load_mode == 'cdc' and args.dedup_index:
+        # The dedup key includes the price, so a price going back to an
+        # earlier value would be dropped before CDC could record it.
+        parser.error('--load-mode cdc cannot be combined with --dedup-index (or DEDUP_INDEX_PATH)')
+    if args.log_format not in LOG_FORMATS:
+        parser.error(f"invalid log format {args.log_format!r}, expected one of {', '.join(LOG_FORMATS)}")
+    try:
+        interval = parse_duration(args.interval)
+        jitter = parse_duration(args.jitter)
+        memory_limit = parse_size(args.memory_limit) if args.memory_limit else None
+        setup_logging(args.log_level.upper(), args.log_format, args.log_sample_every)
+    except ValueError as e:
+        parser.error(str(e))
+
+    sources = host_budgets = None
+    if args.config:
+        try:
+            sources, host_budgets = load_crawl_config(args.config)
+            sources += build_sources(args.urls or [], args.pages)
+        except (OSError, ValueError, TypeError) as e:
+            parser.error(f"invalid --config: {e}")
+        if not sources:
+            parser.error(f'{args.config} defines no sources and no --url was given')
+    elif len(urls) > 1:
+        sources = build_sources(urls, args.pages)
+
+    # Resources created once and kept warm across runs in --serve mode.
+    pool = create_pool(args.db_pool_size)
+    dedup_index = DedupIndex(args.dedup_index) if args.dedup_index else None
+    session = requests.Session()
+    set_http_session(session)
+    sheets_service = get_google_sheets_service_from_env()
+    enrich = None
+    if args.enrich_images:
+        image_cache = ImageCache(args.image_cache) if args.image_cache else None
+        enrich = functools.partial(
+            enrich_images, cache=image_cache, max_workers=args.image_workers,
+            # A replay must not hit the network; use what earlier runs cached.
+            fetch=not args.replay)
+
+    def run_once(report=None):
+        archive = replay = None
+        run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        set_run_id(run_id)
+        try:
+            if args.replay:
+                replay = ArchiveReader(args.archive_dir, args.replay)
+            elif args.archive_dir:
+                archive = PageArchive(args.archive_dir, run_id)
+            # A --serve daemon crosses month boundaries, so not only at pool creation.
+            ensure_partitions(pool)
+            success = etl_pipeline(urls[0], args.pages, sources, host_budgets,
+                                   pool=pool, dedup_index=dedup_index,
+                                   archive=archive, replay=replay,
+                                   validate=not args.no_validate,
+                                   sheets_service=sheets_service,
+                                   report=report, memory_limit=memory_limit,
+                                   spill_dir=args.spill_dir, enrich=enrich,
+                                   load_mode=args.load_mode)
+            if args.retention_months:
+                run_retention(pool, args.retention_months)
+            return success
+        finally:
+            if archive is not None:
+                archive.close()
+            if replay is not None:
+                replay.close()
+
+    try:
+        if args.serve:
+            serve_forever(run_once, interval, jitter, args.health_port)
+            return
+        success = run_once()
+    finally:
+        set_http_session(None)
+        session.close()
+        if pool is not None:
+            pool.close()
+        # Flush queued log records before the final message.
+        shutdown_logging()
     if success:
         print("ETL pipeline completed successfully!")
     else:
@@ -0,0 +1,133 @@
+from utils.archive import (ArchiveReader, PageArchive, extract_archived_products,
+                           list_runs, SEGMENT_FILE)
+from utils.extract import extract_all_products
+from datetime import datetime
+import os
+import threading
+import pytest
+
+
+def card_html(title, image=''):
+    return f"""
+        <div class="collection-card">
+            <img class="collection-image" src="{image}" alt="{title}">
+            <h3 class="product-title">{title}</h3>
+            <span class="price">$10.00</span>
+        </div>
+    """
+
+
+def test_archive_round_trip(tmp_path):
+    """Test that archived pages are read back exactly, in append order."""
+    with PageArchive(str(tmp_path), run_id='run1') as archive:
+        archive.append('http://example.com', card_html('First'), 1)
+        archive.append('http://example.com/page2', card_html('Second') * 50, 2)
+
+    with ArchiveReader(str(tmp_path), 'run1') as reader:
+        pages = list(reader)
+
+    assert [entry['page'] for entry, _ in pages] == [1, 2]
+    assert pages[0][1] == card_html('First')
+    assert pages[1][1] == card_html('Second') * 50
+    segment_size = os.path.getsize(tmp_path / 'run1' / SEGMENT_FILE)
+    assert segment_size < len(card_html('Second') * 50)
+
+
+def test_archive_is_append_only(tmp_path):
+    """Test that reopening a run appends after the existing frames."""
+    with PageArchive(str(tmp_path), run_id='run1') as archive:
+        archive.append('http://example.com', card_html('First'), 1)
+    with PageArchive(str(tmp_path), run_id='run1') as archive:
+        archive.append('http://example.com/page2', card_html('Second'), 2)
+
+    with ArchiveReader(str(tmp_path), 'run1') as reader:
+        assert [html for _, html in reader] == [card_html('First'), card_html('Second')]
+
+
+def test_archive_concurrent_appends(tmp_path):
+    """Test that crawl threads can share one archive."""
+    archive = PageArchive(str(tmp_path), run_id='run1')
+    threads = [threading.Thread(target=archive.append,
+                                args=(f'http://example.com/page{i}', card_html(str(i)), i))
+               for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    archive.close()
+
+    with ArchiveReader(str(tmp_path), 'run1') as reader:
+        pages = {entry['page']: html for entry, html in reader}
+    assert pages == {i: card_html(str(i)) for i in range(20)}
+
+
+def test_archive_reader_replays_in_source_and_page_order(tmp_path):
+    """Test that pages archived in completion order are replayed in crawl_sources' order."""
+    with PageArchive(str(tmp_path), run_id='run1') as archive:
+        archive.append('http://b.example', card_html('b1'), 1, source=1)
+        archive.append('http://a.example/page2', card_html('a2'), 2, source=0)
+        archive.append('http://a.example', card_html('a1'), 1, source=0)
+
+    with ArchiveReader(str(tmp_path), 'run1') as reader:
+        assert [html for _, html in reader] == [card_html('a1'), card_html('a2'),
+                                                card_html('b1')]
+
+
+def test_archive_reader_fetched_at(tmp_path, mocker):
+    """Test that a replay is stamped with the archived run's last fetch time."""
+    mock_datetime = mocker.patch('utils.archive.datetime', wraps=datetime)
+    mock_datetime.now.side_effect = [datetime(2024, 3, 1, 9, 0, 0),
+                                     datetime(2024, 3, 1, 9, 0, 5)]
+    with PageArchive(str(tmp_path), run_id='run1') as archive:
+        archive.append('http://example.com', card_html('First'), 1)
+        archive.append('http://example.com/page2', card_html('Second'), 2)
+
+    with ArchiveReader(str(tmp_path), 'run1') as reader:
+        assert reader.fetched_at == '2024-03-01 09:00:05'
+
+
+def test_archive_reader_latest(tmp_path):
+    """Test that 'latest' resolves to the newest run."""
+    for run_id in ('20240101_000000', '20240102_000000'):
+        with PageArchive(str(tmp_path), run_id=run_id) as archive:
+            archive.append('http://example.com', card_html(run_id), 1)
+
+    assert list_runs(str(tmp_path)) == ['20240101_000000', '20240102_000000']
+    with ArchiveReader(str(tmp_path)) as reader:
+        assert reader.run_id == '20240102_000000'
+
+    with pytest.raises(FileNotFoundError):
+        ArchiveReader(str(tmp_path / 'empty'))
+
+
+def test_extract_all_products_archives_pages(tmp_path, mocker):
+    """Test that extraction archives pages and replay parses them offline."""
+    mocker.patch('time.sleep')
+    mocker.patch('utils.extract.fetch_html',
+                 side_effect=[card_html('First'), card_html('Second'), None])
+    with PageArchive(str(tmp_path), run_id='run1') as archive:
+        crawled = extract_all_products('http://example.com', 3, archive=archive)
+    mock_fetch = mocker.patch('utils.extract.fetch_html')
+
+    with ArchiveReader(str(tmp_path), 'run1') as reader:
+        replayed = extract_archived_products(reader)
+
+    assert [p['title'] for p in replayed] == [p['title'] for p in crawled]
+    assert [p['title'] for p in replayed] == ['First', 'Second']
+    mock_fetch.assert_not_called()
+
+
+def test_replay_resolves_images_against_archived_page_url(tmp_path, mocker):
+    """Test that replayed rows get the same absolute image URLs as the live run."""
+    mocker.patch('time.sleep')
+    mocker.patch('utils.extract.fetch_html',
+                 side_effect=[card_html('First', '/img0.png'),
+                              card_html('Second', 'img1.png'), None])
+    with PageArchive(str(tmp_path), run_id='run1') as archive:
+        crawled = extract_all_products('http://127.0.0.1:8765', 3, archive=archive)
+
+    with ArchiveReader(str(tmp_path), 'run1') as reader:
+        replayed = extract_archived_products(reader)
+
+    assert [p['image_url'] for p in replayed] == [p['image_url'] for p in crawled]
+    assert replayed[0]['image_url'] == 'http://127.0.0.1:8765/img0.png'
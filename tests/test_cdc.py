@@ -0,0 +1,151 @@
+from utils.cdc import apply_changes, diff_against_current, load_changes
+from utils.load import load_data
+from datetime import datetime
+from decimal import Decimal
+import pandas as pd
+import pytest
+
+RUN_1 = datetime(2024, 1, 1, 12, 0)
+RUN_2 = datetime(2024, 1, 2, 12, 0)
+
+
+@pytest.fixture
+def incoming():
+    """Provides a transformed frame from the second run."""
+    return pd.DataFrame({
+        'title': ['Test Product 1', 'Test Product 2', 'Test Product 3', 'Test Product 1'],
+        'price': [319840.0, 500000.0, 639840.0, 999999.0],
+        'rating': [4.5, 3.8, 0.0, 1.0],
+        'colors': [3, 2, 1, 1],
+        'size': ['M', 'L', 'One Size', 'M'],
+        'gender': ['Men', 'Women', 'Unisex', 'Men'],
+        'timestamp': [RUN_2.strftime('%Y-%m-%d %H:%M:%S')] * 4,
+    })
+
+
+@pytest.fixture
+def current():
+    """Provides product_current as read back from PostgreSQL after the first run."""
+    return pd.DataFrame({
+        'title': ['Test Product 1', 'Test Product 2', 'Old Product'],
+        'size': ['M', 'L', 'S'],
+        'gender': ['Men', 'Women', 'Men'],
+        'price': [319840.0, 479840.0, 100.0],
+        'rating': [4.5, 3.8, 1.0],
+        'colors': [3.0, 2.0, 1.0],
+        'valid_from': [RUN_1, RUN_1, RUN_1],
+    })
+
+
+class FakeCursor:
+    """Records executed statements."""
+
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, query, params=None):
+        self.statements.append(query)
+
+
+def test_diff_finds_new_and_changed_products(incoming, current):
+    """Test that only new products and products with changed attributes are returned."""
+    new, changed = diff_against_current(incoming, current, RUN_2)
+
+    assert new['title'].tolist() == ['Test Product 3']
+    assert changed['title'].tolist() == ['Test Product 2']
+    assert changed.loc[0, 'price'] == 500000.0
+
+
+def test_diff_against_empty_state(incoming):
+    """Test that every distinct product is new on the first CDC run."""
+    empty = pd.DataFrame(columns=['title', 'size', 'gender', 'price', 'rating',
+                                  'colors', 'valid_from'])
+
+    new, changed = diff_against_current(incoming, empty, RUN_2)
+
+    assert len(new) == 3
+    assert changed.empty
+
+
+def test_diff_treats_missing_values_as_equal(current):
+    """Test that a NULL attribute on both sides is not a change."""
+    current.loc[0, 'rating'] = None
+    same = current.iloc[[0]].drop(columns='valid_from').assign(rating=float('nan'))
+
+    new, changed = diff_against_current(same, current, RUN_2)
+
+    assert new.empty and changed.empty
+
+
+def test_diff_skips_keys_written_earlier_in_the_same_run(incoming, current):
+    """Test that a later part of a streamed run does not overwrite an earlier part."""
+    current['valid_from'] = RUN_2
+
+    _, changed = diff_against_current(incoming, current, RUN_2)
+
+    assert changed.empty
+
+
+def test_apply_changes_closes_and_opens_history(mocker, incoming, current):
+    """Test that changed products close their open history row before new rows are written."""
+    mock_execute_values = mocker.patch('utils.cdc.extras.execute_values')
+    new, changed = diff_against_current(incoming, current, RUN_2)
+
+    apply_changes(FakeCursor(), new, changed, RUN_2)
+
+    close, history, upsert = mock_execute_values.call_args_list
+    assert 'SET valid_to = v.valid_to' in close.args[1]
+    assert close.args[2] == [('Test Product 2', 'L', 'Women', RUN_2)]
+    assert 'INSERT INTO product_price_history' in history.args[1]
+    assert [row[0] for row in history.args[2]] == ['Test Product 3', 'Test Product 2']
+    assert history.args[2][0][-1] == RUN_2
+    assert 'ON CONFLICT (title, size, gender) DO UPDATE' in upsert.args[1]
+    assert upsert.args[2] == history.args[2]
+
+
+def test_apply_changes_writes_nothing_when_unchanged(mocker):
+    """Test that a run without changes issues no writes."""
+    mock_execute_values = mocker.patch('utils.cdc.extras.execute_values')
+    empty = pd.DataFrame(columns=['title', 'size', 'gender', 'price', 'rating', 'colors'])
+
+    apply_changes(FakeCursor(), empty, empty, RUN_2)
+
+    mock_execute_values.assert_not_called()
+
+
+def test_load_changes_reads_state_under_lock(mocker, incoming):
+    """Test that load_changes locks, reads the batch's current rows and counts the outcome."""
+    mock_execute_values = mocker.patch('utils.cdc.extras.execute_values', return_value=[
+        ('Test Product 1', 'M', 'Men', Decimal('319840'), Decimal('4.5'), 3, RUN_1),
+        ('Test Product 2', 'L', 'Women', Decimal('479840'), Decimal('3.8'), 2, RUN_1),
+    ])
+    cursor = FakeCursor()
+
+    counts = load_changes(cursor, incoming)
+
+    assert 'pg_advisory_xact_lock' in cursor.statements[0]
+    read = mock_execute_values.call_args_list[0]
+    assert 'FROM product_current' in read.args[1]
+    assert 'JOIN (VALUES %s)' in read.args[1]
+    assert read.args[2] == [('Test Product 1', 'M', 'Men'), ('Test Product 2', 'L', 'Women'),
+                           ('Test Product 3', 'One Size', 'Unisex')]
+    assert read.kwargs['fetch'] is True
+    assert counts == {'new': 1, 'changed': 1, 'unchanged': 1}
+
+
+def test_load_data_cdc_mode(mocker, incoming):
+    """Test that the CDC load mode replaces the snapshot insert and reports its counts."""
+    mocker.patch('utils.load.save_to_csv', return_value=True)
+    mocker.patch('utils.load.save_to_google_sheets', return_value=True)
+    mock_snapshot = mocker.patch('utils.load.save_to_postgresql')
+    mock_pool = mocker.MagicMock()
+    mock_load_changes = mocker.patch(
+        'utils.load.load_changes', return_value={'new': 1, 'changed': 0, 'unchanged': 2})
+    report = {}
+
+    assert load_data(incoming, pool=mock_pool, load_mode='cdc', report=report) is True
+    assert load_data(incoming, pool=mock_pool, load_mode='cdc', report=report) is True
+
+    mock_snapshot.assert_not_called()
+    assert mock_load_changes.call_count == 2
+    assert report['cdc'] == {'new': 2, 'changed': 0, 'unchanged': 4}
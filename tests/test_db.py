@@ -0,0 +1,161 @@
+from utils.db import (PostgresPool, EXECUTE_IMAGE_INSERT, EXECUTE_INSERT,
+                      PREPARE_IMAGE_INSERT, PREPARE_INSERT)
+from utils.load import save_to_postgresql
+from datetime import datetime
+import pandas as pd
+import psycopg2
+import pytest
+
+
+@pytest.fixture
+def sample_dataframe():
+    """Provides a sample DataFrame for testing pooled loads."""
+    return pd.DataFrame({
+        'title': ['Test Product 1', 'Test Product 2'],
+        'price': [19.99, 29.99],
+        'rating': [4.5, 3.8],
+        'colors': [3, 2],
+        'size': ['M', 'L'],
+        'gender': ['Men', 'Women'],
+        'timestamp': [datetime.now(), datetime.now()]
+    })
+
+
+@pytest.fixture
+def mock_pg_pool(mocker):
+    """Patches the psycopg2 pool so PostgresPool never opens real connections."""
+    mocker.patch('utils.db.postgres_connection_params',
+                 return_value={'dbname': 'test'})
+    mock_pool_cls = mocker.patch('utils.db.pg_pool.ThreadedConnectionPool')
+    conn = mocker.MagicMock()
+    conn.closed = 0
+    mock_pool_cls.return_value.getconn.return_value = conn
+    return mock_pool_cls, conn
+
+
+def executed_sql(conn):
+    cursor = conn.cursor.return_value.__enter__.return_value
+    return [call.args[0] for call in cursor.execute.call_args_list]
+
+
+def test_pool_sets_up_schema_once(mocker, mock_pg_pool):
+    """Test that the schema is created once, when the pool starts."""
+    mock_setup_schema = mocker.patch('utils.db.setup_schema')
+    mocker.patch('utils.db.extras.execute_batch')
+    mock_pool_cls, _ = mock_pg_pool
+
+    pool = PostgresPool(minconn=1, maxconn=3)
+    pool.insert_products(pd.DataFrame(columns=['title', 'price', 'rating', 'colors',
+                                               'size', 'gender', 'timestamp']))
+
+    mock_pool_cls.assert_called_once_with(1, 3, dbname='test')
+    mock_setup_schema.assert_called_once()
+
+
+def test_pool_prepares_insert_once_per_connection(mocker, mock_pg_pool, sample_dataframe):
+    """Test that a warm connection reuses its prepared insert."""
+    mocker.patch('utils.db.setup_schema')
+    mock_execute_batch = mocker.patch('utils.db.extras.execute_batch')
+    _, conn = mock_pg_pool
+
+    pool = PostgresPool()
+    pool.insert_products(sample_dataframe)
+    pool.insert_products(sample_dataframe)
+
+    assert executed_sql(conn).count(PREPARE_INSERT) == 1
+    assert mock_execute_batch.call_count == 2
+    assert mock_execute_batch.call_args.args[1] == EXECUTE_INSERT
+    assert len(mock_execute_batch.call_args.args[2]) == 2
+    stats = pool.stats()
+    assert stats['statements_prepared'] == 1
+    assert stats['rows_inserted'] == 4
+    assert stats['in_use'] == 0
+
+
+def test_pool_inserts_image_columns_when_enriched(mocker, mock_pg_pool, sample_dataframe):
+    """Test that enriched frames use the image insert, with missing metadata as NULL."""
+    mocker.patch('utils.db.setup_schema')
+    mock_execute_batch = mocker.patch('utils.db.extras.execute_batch')
+    _, conn = mock_pg_pool
+    enriched = sample_dataframe.assign(
+        image_url=['https://example.com/1.jpg', None],
+        image_bytes=pd.array([1024, None], dtype='Int64'),
+        image_width=pd.array([40, None], dtype='Int64'),
+        image_height=pd.array([30, None], dtype='Int64'),
+        image_dhash=['00ff00ff00ff00ff', None])
+
+    pool = PostgresPool()
+    pool.insert_products(sample_dataframe)
+    pool.insert_products(enriched)
+
+    statements = executed_sql(conn)
+    assert statements.count(PREPARE_INSERT) == 1
+    assert statements.count(PREPARE_IMAGE_INSERT) == 1
+    assert mock_execute_batch.call_args.args[1] == EXECUTE_IMAGE_INSERT
+    first, second = mock_execute_batch.call_args.args[2]
+    assert first[7:] == ('https://example.com/1.jpg', 1024, 40, 30, '00ff00ff00ff00ff')
+    assert second[7:] == (None, None, None, None, None)
+
+
+def test_pool_replaces_unhealthy_connection(mocker, mock_pg_pool):
+    """Test that a connection failing its health check is discarded."""
+    mocker.patch('utils.db.setup_schema')
+    mock_pool_cls, conn = mock_pg_pool
+    dead = mocker.MagicMock()
+    dead.closed = 1
+    mock_pool_cls.return_value.getconn.side_effect = [conn, dead, conn]
+
+    pool = PostgresPool()
+    with pool.connection():
+        pass
+
+    mock_pool_cls.return_value.putconn.assert_any_call(dead, close=True)
+    assert pool.stats()['reconnects'] == 1
+
+
+def test_pool_discards_connection_on_operational_error(mocker, mock_pg_pool):
+    """Test that connections broken mid-use are closed rather than reused."""
+    mocker.patch('utils.db.setup_schema')
+    mock_pool_cls, conn = mock_pg_pool
+
+    pool = PostgresPool()
+    with pytest.raises(psycopg2.OperationalError):
+        with pool.connection():
+            raise psycopg2.OperationalError('server closed the connection')
+
+    mock_pool_cls.return_value.putconn.assert_called_with(conn, close=True)
+
+
+def test_pool_health_check_failure(mocker, mock_pg_pool):
+    """Test that health_check reports a failing round trip."""
+    mocker.patch('utils.db.setup_schema')
+    pool = PostgresPool(health_check_interval=0)
+    mocker.patch.object(pool, 'connection',
+                        side_effect=psycopg2.OperationalError('down'))
+
+    assert pool.health_check() is False
+
+
+def test_pool_ensures_partitions_on_every_call(mocker, mock_pg_pool):
+    """Test that each call re-checks the monthly partitions, not only pool creation."""
+    mocker.patch('utils.db.setup_schema')
+    mock_ensure = mocker.patch('utils.db.ensure_current_partitions',
+                               return_value=['fashion_products_p202501'])
+    pool = PostgresPool(partitioned=True)
+
+    pool.ensure_partitions()
+    assert pool.ensure_partitions() == ['fashion_products_p202501']
+
+    assert mock_ensure.call_count == 2
+
+
+def test_save_to_postgresql_uses_pool(mocker, sample_dataframe):
+    """Test that save_to_postgresql reuses the pool instead of connecting."""
+    mock_get_conn = mocker.patch('utils.load.get_postgres_connection')
+    mock_pool = mocker.MagicMock()
+
+    result = save_to_postgresql(sample_dataframe, pool=mock_pool)
+
+    mock_pool.insert_products.assert_called_once_with(sample_dataframe)
+    mock_get_conn.assert_not_called()
+    assert result is True
@@ -0,0 +1,94 @@
+from utils.dedup import BloomFilter, DedupIndex, row_hashes
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def products():
+    """Provides a transformed product frame."""
+    return pd.DataFrame({
+        'title': ['Test Product 1', 'Test Product 2', 'Test Product 3'],
+        'price': [319840.0, 479840.0, 639840.0],
+        'rating': [4.5, 3.8, 0.0],
+        'colors': [3, 2, 1],
+        'size': ['M', 'L', 'One Size'],
+        'gender': ['Men', 'Women', 'Unisex'],
+        'timestamp': ['2023-01-01 12:00:00'] * 3
+    })
+
+
+def test_row_hashes_use_natural_key_only(products):
+    """Test that rows differing only in non-key columns hash the same."""
+    changed = products.assign(rating=1.0, timestamp='2024-01-01 00:00:00')
+
+    assert row_hashes(products).dtype == np.uint64
+    assert np.array_equal(row_hashes(products), row_hashes(changed))
+    assert len(set(row_hashes(products))) == 3
+
+
+def test_bloom_filter_has_no_false_negatives():
+    """Test that every added hash is reported as possibly present."""
+    rng = np.random.default_rng(0)
+    added = rng.integers(0, 2**63, size=5000, dtype=np.uint64)
+    others = rng.integers(0, 2**63, size=5000, dtype=np.uint64)
+    bloom = BloomFilter.for_capacity(5000, error_rate=0.01)
+
+    bloom.add(added)
+
+    assert bloom.might_contain(added).all()
+    assert bloom.might_contain(others).mean() < 0.05
+
+
+@pytest.mark.parametrize('use_bloom', [True, False])
+def test_filter_new_skips_rows_from_earlier_runs(tmp_path, products, use_bloom):
+    """Test that rows loaded by an earlier run are filtered out after reopening."""
+    path = str(tmp_path / 'dedup.npy')
+    first_run = DedupIndex(path, use_bloom=use_bloom)
+    new_rows, hashes = first_run.filter_new(products.iloc[:2])
+    assert len(new_rows) == 2
+    first_run.add(hashes)
+    first_run.save()
+
+    second_run = DedupIndex(path, use_bloom=use_bloom)
+    new_rows, hashes = second_run.filter_new(products)
+
+    assert len(second_run) == 2
+    assert new_rows['title'].tolist() == ['Test Product 3']
+    assert len(hashes) == 1
+
+
+def test_dirty_tracks_unsaved_hashes(tmp_path, products):
+    """Test that the index is only dirty between adding new hashes and saving."""
+    index = DedupIndex(str(tmp_path / 'dedup.npy'))
+    index.add(np.empty(0, dtype=np.uint64))
+    assert not index.dirty
+
+    index.add(index.filter_new(products)[1])
+    assert index.dirty
+    index.save()
+    assert not index.dirty
+
+
+def test_add_grows_bloom_filter(tmp_path):
+    """Test that the index stays correct past the Bloom filter's capacity."""
+    index = DedupIndex(str(tmp_path / 'dedup.npy'))
+    hashes = np.arange(1, 5001, dtype=np.uint64) * np.uint64(2654435761)
+
+    index.add(hashes[:2000])
+    index.add(hashes[2000:])
+
+    assert index.bloom.capacity >= 5000
+    assert index.contains(hashes).all()
+    assert not index.contains(hashes + np.uint64(1)).any()
+
+
+def test_filter_new_empty_frame(tmp_path):
+    """Test that an empty frame passes through unchanged."""
+    index = DedupIndex(str(tmp_path / 'dedup.npy'))
+    empty = pd.DataFrame(columns=['title', 'price', 'size', 'gender'])
+
+    new_rows, hashes = index.filter_new(empty)
+
+    assert new_rows.empty
+    assert len(hashes) == 0
@@ -0,0 +1,158 @@
+from utils.enrich import ImageCache, dhash, enrich_images, image_metadata
+from utils.transform import transform_data
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import io
+import os
+import threading
+import pandas as pd
+from PIL import Image
+import pytest
+
+
+def png_bytes(size=(40, 30), color=(200, 30, 30), stripe=True):
+    image = Image.new('RGB', size, color)
+    if stripe:
+        for x in range(size[0] // 2):
+            for y in range(size[1]):
+                image.putpixel((x, y), (x * 6 % 256, 0, 255))
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def image_server():
+    """Serves a few images from a local stub server and counts the requests per path."""
+    images = {
+        '/red.png': png_bytes(),
+        '/red-copy.png': png_bytes(),
+        '/blue.png': png_bytes((20, 20), (0, 0, 255), stripe=False),
+        '/broken.png': b'not an image',
+    }
+    hits = {}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            with lock:
+                hits[self.path] = hits.get(self.path, 0) + 1
+            body = images.get(self.path)
+            if body is None:
+                self.send_response(404)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/png')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}", images, hits
+    server.shutdown()
+    server.server_close()
+
+
+def frame(urls):
+    return pd.DataFrame({'title': [f'Product {i}' for i in range(len(urls))],
+                         'image_url': urls})
+
+
+def test_dhash_matches_resized_copy():
+    """Test that a resized copy of an image keeps its dHash and another image does not."""
+    original = Image.open(io.BytesIO(png_bytes((80, 60))))
+    resized = original.resize((40, 30))
+    other = Image.open(io.BytesIO(png_bytes(stripe=False)))
+
+    assert len(dhash(original)) == 16
+    assert dhash(original) == dhash(resized)
+    assert dhash(original) != dhash(other)
+
+
+def test_image_metadata_undecodable():
+    """Test that undecodable content still reports its size."""
+    metadata = image_metadata(b'not an image')
+
+    assert metadata == {'image_bytes': 12, 'image_width': None,
+                        'image_height': None, 'image_dhash': None}
+
+
+def test_enrich_images_joins_metadata(image_server):
+    """Test that each distinct image is fetched once and joined onto every row using it."""
+    base, images, hits = image_server
+    data = frame([f'{base}/red.png', f'{base}/blue.png', f'{base}/red.png',
+                  f'{base}/missing.png', None])
+    report = {}
+
+    enriched = enrich_images(data, max_workers=4, report=report)
+
+    assert hits == {'/red.png': 1, '/blue.png': 1, '/missing.png': 1}
+    assert enriched['image_bytes'].tolist()[:3] == [
+        len(images['/red.png']), len(images['/blue.png']), len(images['/red.png'])]
+    assert enriched.loc[0, 'image_width'] == 40
+    assert enriched.loc[1, 'image_height'] == 20
+    assert enriched.loc[0, 'image_dhash'] == enriched.loc[2, 'image_dhash']
+    assert enriched.loc[3, 'image_bytes'] is pd.NA
+    assert pd.isna(enriched.loc[4, 'image_dhash'])
+    assert report['images'] == {'unique': 3, 'cached': 0, 'fetched': 2, 'failed': 1,
+                                'skipped': 0}
+
+
+def test_enrich_images_without_fetch_uses_cache_only(image_server, tmp_path):
+    """Test that fetch=False answers from the cache and never touches the network."""
+    base, _, hits = image_server
+    enrich_images(frame([f'{base}/red.png']), cache=ImageCache(str(tmp_path)))
+    report = {}
+
+    enriched = enrich_images(frame([f'{base}/red.png', f'{base}/blue.png']),
+                             cache=ImageCache(str(tmp_path)), report=report, fetch=False)
+
+    assert hits == {'/red.png': 1}
+    assert enriched.loc[0, 'image_width'] == 40
+    assert enriched.loc[1, 'image_bytes'] is pd.NA
+    assert report['images'] == {'unique': 2, 'cached': 1, 'fetched': 0, 'failed': 0,
+                                'skipped': 1}
+
+
+def test_enrich_images_warns_about_relative_urls(image_server, mocker):
+    """Test that URLs left relative are skipped with a warning, not silently."""
+    base, _, hits = image_server
+    mock_logger = mocker.patch('utils.enrich.logger')
+
+    enriched = enrich_images(frame([f'{base}/blue.png', 'red.png', 'data:x']))
+
+    assert hits == {'/blue.png': 1}
+    assert enriched.loc[1, 'image_bytes'] is pd.NA
+    mock_logger.warning.assert_called_once_with(
+        "Skipped 2 image URLs that are not absolute http(s) URLs")
+
+
+def test_image_cache_skips_seen_urls(image_server, tmp_path):
+    """Test that images cached by an earlier run are not fetched again."""
+    base, _, hits = image_server
+    data = frame([f'{base}/red.png', f'{base}/red-copy.png', f'{base}/broken.png'])
+
+    first = enrich_images(data, cache=ImageCache(str(tmp_path)))
+    report = {}
+    second = enrich_images(data, cache=ImageCache(str(tmp_path)), report=report)
+
+    assert hits == {'/red.png': 1, '/red-copy.png': 1, '/broken.png': 1}
+    assert report['images']['cached'] == 3
+    pd.testing.assert_frame_equal(first, second)
+    # Identical bytes under two URLs are stored once.
+    assert len(os.listdir(tmp_path / 'objects')) == 2
+    assert len(os.listdir(tmp_path / 'refs')) == 3
+
+
+def test_transform_data_keeps_image_url():
+    """Test that transform_data keeps image_url only when asked to."""
+    raw = [{'title': 'Test Product 1', 'price': '19.99', 'gender': 'Men',
+            'image_url': 'https://example.com/1.jpg'}]
+
+    assert 'image_url' not in transform_data(raw).columns
+    kept = transform_data(raw, keep_image_url=True)
+    assert kept['image_url'].tolist() == ['https://example.com/1.jpg']
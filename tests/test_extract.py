@@ -1,4 +1,5 @@
-from utils.extract import extract_all_products, fetch_html, extract_products_from_html
+from utils.extract import (extract_all_products, fetch_html, extract_products_from_html,
+                           parse_price, parse_rating, parse_colors, set_http_session)
 import requests
 import pytest
 
@@ -67,6 +68,26 @@ def test_extract_products_from_html(sample_html_and_products):
     assert result[1]['rating'] is None  # Check invalid rating parsing
 
 
+@pytest.mark.parametrize('src, expected', [
+    ('/images/1.jpg', 'http://example.com/images/1.jpg'),
+    ('images/1.jpg', 'http://example.com/shop/images/1.jpg'),
+    ('https://cdn.example/1.jpg', 'https://cdn.example/1.jpg'),
+    ('', ''),
+])
+def test_extract_products_from_html_resolves_image_urls(src, expected):
+    """Test that image URLs are resolved against the page they were found on."""
+    html = f"""
+        <div class="collection-card">
+            <img class="collection-image" src="{src}" alt="Test Product">
+            <h3 class="product-title">Test Product</h3>
+        </div>
+    """
+
+    [product] = extract_products_from_html(html, 'http://example.com/shop/page2')
+
+    assert product['image_url'] == expected
+
+
 def test_extract_products_from_html_empty_and_invalid():
     """Test extract_products_from_html with empty and invalid HTML."""
     assert extract_products_from_html("") == []
@@ -96,6 +117,24 @@ def test_fetch_html_success(mocker):
     assert 'User-Agent' in kwargs['headers']
 
 
+def test_fetch_html_uses_persistent_session(mocker):
+    """Test that fetch_html reuses a configured session instead of requests.get."""
+    mock_get = mocker.patch('requests.get')
+    session = mocker.MagicMock()
+    session.get.return_value.status_code = 200
+    session.get.return_value.text = "HTML content"
+
+    set_http_session(session)
+    try:
+        result = fetch_html("http://example.com")
+    finally:
+        set_http_session(None)
+
+    assert result == "HTML content"
+    session.get.assert_called_once()
+    mock_get.assert_not_called()
+
+
 def test_fetch_html_failure(mocker):
     """Test fetch_html when HTTP request fails."""
     mock_get = mocker.patch('requests.get')
@@ -141,8 +180,8 @@ def test_extract_all_products(mocker):
     mock_fetch_html.assert_any_call("http://example.com/page3")
 
     assert mock_extract_products.call_count == 2
-    mock_extract_products.assert_any_call("page1 content")
-    mock_extract_products.assert_any_call("page2 content")
+    mock_extract_products.assert_any_call("page1 content", "http://example.com")
+    mock_extract_products.assert_any_call("page2 content", "http://example.com/page2")
 
 
 def test_extract_all_products_no_content(mocker):
@@ -156,3 +195,57 @@ def test_extract_all_products_no_content(mocker):
 
     assert result == []
     mock_extract_products.assert_not_called()
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('$99.99', 99.99),
+    ('$1,234.50', 1234.5),
+    (' 12 ', 12.0),
+    ('Price Unavailable', None),
+    (None, None),
+])
+def test_parse_price(text, expected):
+    """Test price parsing."""
+    assert parse_price(text) == expected
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('Rating: ⭐ 4.8 / 5', 4.8),
+    ('Rating: ⭐4.5/5', 4.5),
+    ('Rating: ⭐ 3 / 5', 3.0),
+    ('Rating: ⭐ Invalid Rating / 5', None),
+    ('Rating: Not Rated', None),
+    (None, None),
+    (['Rating: ⭐ 4.8 / 5'], None),
+])
+def test_parse_rating(text, expected):
+    """Test rating parsing on the regex fast path and the fallback."""
+    assert parse_rating(text) == expected
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('3 Colors', 3),
+    ('12 Colors', 12),
+    ('Colors', None),
+    ('3.5 Colors', None),
+    ('3Colors', None),
+    (' 4 Colors', 4),
+    (None, None),
+    (['3 Colors'], None),
+])
+def test_parse_colors(text, expected):
+    """Test colors parsing."""
+    assert parse_colors(text) == expected
+
+
+def test_detail_parsers_are_memoized():
+    """Test that repeated detail strings are served from the LRU cache."""
+    parse_rating.cache_clear()
+    text = ''.join(['Rating: ⭐ 4.2 / 5'])
+
+    for _ in range(3):
+        parse_rating(text)
+
+    info = parse_rating.cache_info()
+    assert info.misses == 1
+    assert info.hits == 2
@@ -1,4 +1,5 @@
-from utils.load import save_to_csv, save_to_google_sheets, save_to_postgresql, load_data
+from utils.load import (save_to_csv, save_to_google_sheets, save_to_postgresql, load_data,
+                        save_quarantine, primary_sink, LoadStream)
 import os
 import pandas as pd
 import csv
@@ -46,6 +47,19 @@ def test_save_to_csv_failure(mocker, sample_dataframe):
     assert result is False
 
 
+def test_save_quarantine(mocker, sample_dataframe):
+    """Test that quarantined rows go to their own timestamped CSV."""
+    mock_datetime = mocker.patch('utils.load.datetime')
+    mock_datetime.now.return_value = datetime(2023, 1, 1, 12, 0, 0)
+    mock_save = mocker.patch('utils.load.save_to_csv', return_value=True)
+
+    result = save_quarantine(sample_dataframe)
+
+    mock_save.assert_called_once_with(
+        sample_dataframe, 'quarantine_20230101_120000.csv')
+    assert result is True
+
+
 def test_save_to_google_sheets_success(mocker, sample_dataframe):
     """Test successful Google Sheets saving."""
     mocker.patch('utils.load.os.path.exists', return_value=True)
@@ -64,6 +78,21 @@ def test_save_to_google_sheets_success(mocker, sample_dataframe):
     assert result is True
 
 
+def test_save_to_google_sheets_reuses_service(mocker, sample_dataframe):
+    """Test that a warm Sheets client is reused instead of rebuilt."""
+    mocker.patch.dict('os.environ', {'GOOGLE_SHEET_CREDENTIALS_PATH': 'creds.json',
+                                     'GOOGLE_SHEET_ID': 'sheet-id'})
+    mocker.patch('utils.load.os.path.exists', return_value=True)
+    mock_build = mocker.patch('utils.load.build')
+    service = mocker.MagicMock()
+
+    result = save_to_google_sheets(sample_dataframe, service=service)
+
+    mock_build.assert_not_called()
+    service.spreadsheets.assert_called_once()
+    assert result is True
+
+
 def test_save_to_google_sheets_missing_credentials(mocker, sample_dataframe):
     """Test Google Sheets saving with missing credentials file."""
     mocker.patch('utils.load.os.path.exists', return_value=False)
@@ -154,6 +183,34 @@ def test_load_data_partial_failure(mocker, sample_dataframe):
     assert result is False
 
 
+def test_load_data_reports_each_sink(mocker, sample_dataframe):
+    """Test that load_data reports each sink's outcome, not only the overall one."""
+    mocker.patch('utils.load.datetime')
+    mocker.patch('utils.load.save_to_csv', return_value=True)
+    mocker.patch('utils.load.save_to_google_sheets', return_value=False)
+    mocker.patch('utils.load.save_to_postgresql', side_effect=Exception('down'))
+    sinks = {}
+
+    assert load_data(sample_dataframe, sinks=sinks) is False
+    assert sinks == {'csv': True, 'google_sheets': False, 'postgresql': False}
+
+
+@pytest.mark.parametrize('env, pool, expected', [
+    ({}, None, 'csv'),
+    ({}, object(), 'postgresql'),
+    ({name: 'x' for name in ('DB_NAME', 'DB_USER', 'DB_HOST', 'DB_PORT', 'DB_PASSWORD')},
+     None, 'postgresql'),
+])
+def test_primary_sink(monkeypatch, env, pool, expected):
+    """Test that PostgreSQL is the primary sink when configured, CSV otherwise."""
+    for name in ('DB_NAME', 'DB_USER', 'DB_HOST', 'DB_PORT', 'DB_PASSWORD'):
+        monkeypatch.delenv(name, raising=False)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+
+    assert primary_sink(pool) == expected
+
+
 def test_load_data_empty_dataframe(mocker):
     """Test load_data with an empty DataFrame."""
     mock_logger = mocker.patch('utils.load.logger')
@@ -175,3 +232,23 @@ def test_load_data_unhandled_exception(mocker, sample_dataframe):
 
     mock_logger.error.assert_called_once()
     assert result is False
+
+
+def test_load_data_stream_appends_later_parts(mocker, sample_dataframe):
+    """Test that a streamed load appends to one CSV and continues down the sheet."""
+    mock_csv = mocker.patch('utils.load.save_to_csv', return_value=True)
+    mock_sheets = mocker.patch(
+        'utils.load.save_to_google_sheets', return_value=True)
+    mocker.patch('utils.load.save_to_postgresql', return_value=True)
+    stream = LoadStream()
+
+    assert load_data(sample_dataframe, stream=stream) is True
+    assert load_data(sample_dataframe, stream=stream) is True
+
+    first, second = mock_csv.call_args_list
+    assert first.args[1] == second.args[1] == stream.csv_filename
+    assert first.kwargs['append'] is False
+    assert second.kwargs['append'] is True
+    rows = [call.kwargs['start_row'] for call in mock_sheets.call_args_list]
+    assert rows == [1, 4]
+    assert stream.sheet_row == 6
@@ -0,0 +1,107 @@
+from utils.log import (SAMPLED, JsonFormatter, SamplingFilter, set_run_id,
+                       set_stage, setup_logging, shutdown_logging)
+import io
+import json
+import logging
+import threading
+import pytest
+
+
+@pytest.fixture
+def log_stream():
+    """Routes logging through setup_logging into a buffer and restores the root logger after."""
+    root = logging.getLogger()
+    level = root.level
+    stream = io.StringIO()
+    yield stream
+    shutdown_logging()
+    set_run_id(None)
+    set_stage(None)
+    root.setLevel(level)
+
+
+def make_record(msg='Fetching page %d', args=(1,), level=logging.INFO, **extra):
+    record = logging.LogRecord('utils.extract', level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_sampling_filter_keeps_every_nth_sampled_record():
+    """Test that sampled records are thinned per message and others always pass."""
+    sampler = SamplingFilter(every=10)
+
+    kept = [n for n in range(1, 26) if sampler.filter(make_record(args=(n,), **SAMPLED))]
+
+    assert kept == [1, 11, 21]
+    assert sampler.filter(make_record(msg='Total products extracted'))
+    assert sampler.filter(make_record(level=logging.WARNING, **SAMPLED))
+
+
+def test_json_formatter_includes_context_and_extra():
+    """Test that JSON events carry run and stage IDs and extra fields."""
+    record = make_record(run_id='20240101_120000', stage='extract', host='example.com')
+
+    event = json.loads(JsonFormatter().format(record))
+
+    assert event['message'] == 'Fetching page 1'
+    assert event['level'] == 'INFO'
+    assert event['run_id'] == '20240101_120000'
+    assert event['stage'] == 'extract'
+    assert event['host'] == 'example.com'
+
+
+def test_setup_logging_writes_json_from_background_thread(log_stream):
+    """Test that records are stamped with the run and stage and written by the listener."""
+    listener = setup_logging(logging.INFO, 'json', sample_every=2, stream=log_stream)
+    set_run_id('run-1')
+    set_stage('extract')
+    logger = logging.getLogger('utils.extract')
+
+    for page in range(1, 5):
+        logger.info("Fetching page %d", page, extra=SAMPLED)
+    worker = threading.Thread(target=logger.warning, args=("Failed to fetch page %d", 5))
+    worker.start()
+    worker.join()
+    logging.getLogger('utils.extract').debug("not written")
+    shutdown_logging()
+
+    events = [json.loads(line) for line in log_stream.getvalue().splitlines()]
+    assert [event['message'] for event in events] == [
+        'Fetching page 1', 'Fetching page 3', 'Failed to fetch page 5']
+    assert all(event['run_id'] == 'run-1' and event['stage'] == 'extract'
+               for event in events)
+    assert listener._thread is None
+
+
+def test_setup_logging_defers_formatting(log_stream, mocker):
+    """Test that messages are formatted by the listener, not the logging thread."""
+    threads = []
+    original_format = JsonFormatter.format
+
+    def recording_format(self, record):
+        threads.append(threading.get_ident())
+        return original_format(self, record)
+
+    mocker.patch.object(JsonFormatter, 'format', recording_format)
+    setup_logging(logging.INFO, 'json', stream=log_stream)
+
+    logging.getLogger('utils.transform').info("Final data shape: %s", (3, 7))
+    shutdown_logging()
+
+    assert len(threads) == 1
+    assert threads[0] != threading.get_ident()
+    assert json.loads(log_stream.getvalue())['message'] == 'Final data shape: (3, 7)'
+
+
+def test_shutdown_logging_restores_record_flags(log_stream):
+    """Test that the caller/thread/process lookups are switched back on after shutdown."""
+    before = (logging._srcfile, logging.logThreads, logging.logProcesses,
+              logging.logMultiprocessing)
+    setup_logging(logging.INFO, 'text', stream=log_stream)
+    setup_logging(logging.INFO, 'json', stream=log_stream)
+    assert logging._srcfile is None and not logging.logThreads
+
+    shutdown_logging()
+
+    assert (logging._srcfile, logging.logThreads, logging.logProcesses,
+            logging.logMultiprocessing) == before
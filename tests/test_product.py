@@ -0,0 +1,81 @@
+from utils.product import Product, products_to_frame, PRODUCT_FIELDS
+from utils.transform import transform_data
+import pytest
+
+
+@pytest.fixture
+def raw_product():
+    """Provides a product dict as returned by parse_product_card."""
+    return {
+        'image_url': 'https://example.com/images/products/1.jpg',
+        'product_alt': 'T-shirt 1',
+        'title': 'T-shirt 1',
+        'price': 99.99,
+        'rating': 4.5,
+        'colors': 3,
+        'size': 'M',
+        'gender': 'Men'
+    }
+
+
+def test_product_behaves_like_dict(raw_product):
+    """Test that Product exposes the same keys and values as the raw dict."""
+    product = Product.from_dict(raw_product)
+
+    assert dict(product) == raw_product
+    assert product.to_dict() == raw_product
+    assert product['title'] == 'T-shirt 1'
+    assert product.get('missing') is None
+    with pytest.raises(KeyError):
+        product['missing']
+
+
+def test_product_has_no_instance_dict(raw_product):
+    """Test that Product stores its fields in slots."""
+    product = Product.from_dict(raw_product)
+
+    assert not hasattr(product, '__dict__')
+    with pytest.raises(AttributeError):
+        product.extra = 'value'
+
+
+def test_product_interns_low_cardinality_fields(raw_product):
+    """Test that equal sizes, genders and image prefixes share one object."""
+    other = dict(raw_product, image_url='https://example.com/images/products/2.jpg')
+    other['size'] = ''.join(['M'] * 1)
+    other['gender'] = 'Me' + 'n'.strip()
+    first = Product.from_dict(raw_product)
+    second = Product.from_dict(other)
+
+    assert first.gender is second.gender
+    assert first.size is second.size
+    assert first._image_prefix is second._image_prefix
+    assert second.image_url == 'https://example.com/images/products/2.jpg'
+
+
+def test_product_missing_fields():
+    """Test that absent fields read as None."""
+    product = Product(title='Only Title', product_alt='Different Alt')
+
+    assert product['image_url'] is None
+    assert product['product_alt'] == 'Different Alt'
+    assert Product(title='No Alt')['product_alt'] is None
+
+
+def test_products_to_frame(raw_product):
+    """Test conversion to the raw DataFrame layout."""
+    df = products_to_frame([Product.from_dict(raw_product)] * 2)
+
+    assert list(df.columns) == list(PRODUCT_FIELDS)
+    assert len(df) == 2
+    assert df['image_url'].iloc[0] == raw_product['image_url']
+
+
+def test_transform_data_accepts_products(raw_product, mocker):
+    """Test that transform_data gives the same result for Products and dicts."""
+    mocker.patch('utils.transform.datetime')
+
+    from_dicts = transform_data([raw_product])
+    from_products = transform_data([Product.from_dict(raw_product)])
+
+    assert from_products.equals(from_dicts)
@@ -0,0 +1,104 @@
+from utils.scheduler import (HostBudget, build_sources, crawl_sources,
+                             iter_crawl_pages, load_crawl_config)
+import json
+import threading
+import pytest
+
+
+def no_delay():
+    return HostBudget(concurrency=1, min_delay=0, max_delay=0)
+
+
+def test_build_sources():
+    """Test that seeds are normalized into url/pages sources."""
+    sources = build_sources(
+        ['http://a.example/', {'url': 'http://b.example', 'pages': 2}], max_pages=5)
+
+    assert sources == [
+        {'url': 'http://a.example', 'pages': 5},
+        {'url': 'http://b.example', 'pages': 2},
+    ]
+    with pytest.raises(ValueError):
+        build_sources([{'pages': 2}])
+
+
+def test_host_budget_validation():
+    """Test that invalid budgets are rejected."""
+    with pytest.raises(ValueError):
+        HostBudget(concurrency=0)
+    with pytest.raises(ValueError):
+        HostBudget(min_delay=2.0, max_delay=1.0)
+
+
+def test_host_budget_spaces_requests(mocker):
+    """Test that consecutive requests to a host are spaced by the delay."""
+    mocker.patch('utils.scheduler.time.monotonic', return_value=100.0)
+    mock_sleep = mocker.patch('utils.scheduler.time.sleep')
+    budget = HostBudget(concurrency=1, min_delay=2.0, max_delay=2.0)
+
+    budget.wait()
+    budget.wait()
+    budget.wait()
+
+    assert [call.args[0] for call in mock_sleep.call_args_list] == [2.0, 4.0]
+
+
+def test_load_crawl_config(tmp_path):
+    """Test loading sources and per-host budgets from a config file."""
+    config_file = tmp_path / 'crawl.json'
+    config_file.write_text(json.dumps({
+        'defaults': {'pages': 3, 'min_delay': 0.5, 'max_delay': 0.5},
+        'hosts': {'a.example': {'concurrency': 2}},
+        'sources': ['http://a.example', {'url': 'http://b.example/shoes', 'pages': 1}],
+    }))
+
+    sources, budgets = load_crawl_config(config_file)
+
+    assert sources == [
+        {'url': 'http://a.example', 'pages': 3},
+        {'url': 'http://b.example/shoes', 'pages': 1},
+    ]
+    assert budgets['a.example'].concurrency == 2
+    assert budgets['a.example'].min_delay == 0.5
+    assert budgets['b.example'].concurrency == 1
+
+
+def test_crawl_sources_merges_in_source_order(mocker):
+    """Test that all sources feed a single product list in source order."""
+    pages = {
+        'http://a.example': 'a1',
+        'http://a.example/page2': 'a2',
+        'http://b.example': 'b1',
+    }
+    mocker.patch('utils.scheduler.fetch_html', side_effect=pages.get)
+    mocker.patch('utils.scheduler.extract_products_from_html',
+                 side_effect=lambda html, url: [{'title': html}])
+    sources = build_sources(['http://a.example', 'http://b.example'], 3)
+    budgets = {'a.example': no_delay(), 'b.example': no_delay()}
+
+    result = crawl_sources(sources, budgets)
+
+    assert [p['title'] for p in result] == ['a1', 'a2', 'b1']
+
+
+def test_slow_host_does_not_stall_others(mocker):
+    """Test that a blocked host does not keep other hosts from being crawled."""
+    b_finished = threading.Event()
+
+    def fetch(url):
+        if url.startswith('http://slow.example'):
+            assert b_finished.wait(timeout=5)
+            return None
+        if url == 'http://fast.example/page2':
+            b_finished.set()
+        return url
+
+    mocker.patch('utils.scheduler.fetch_html', side_effect=fetch)
+    mocker.patch('utils.scheduler.extract_products_from_html',
+                 side_effect=lambda html, url: [{'title': html}])
+    sources = build_sources(['http://slow.example', 'http://fast.example'], 2)
+    budgets = {'slow.example': no_delay(), 'fast.example': no_delay()}
+
+    pages = list(iter_crawl_pages(sources, budgets))
+
+    assert [(index, page) for index, page, _ in pages] == [(1, 1), (1, 2)]
@@ -0,0 +1,150 @@
+from utils.schema import (apply_migrations, drop_partitions_older_than,
+                          ensure_monthly_partitions, retention_cutoff, setup_schema)
+from datetime import date, datetime
+import pytest
+
+
+class FakeCursor:
+    """Records executed SQL and answers the few queries the schema layer reads."""
+
+    def __init__(self, applied=(), partitions=(), bounds=(None, None), columns=()):
+        self.applied = list(applied)
+        self.columns = list(columns)
+        self.partitions = list(partitions)
+        self.bounds = bounds
+        self.statements = []
+        self._result = []
+
+    def execute(self, query, params=None):
+        query = ' '.join(query.split())
+        self.statements.append(query)
+        if query.startswith('SELECT version FROM schema_migrations'):
+            self._result = [(v,) for v in self.applied]
+        elif 'FROM pg_inherits' in query:
+            self._result = [(name,) for name in self.partitions]
+        elif query.startswith('SELECT min(timestamp)'):
+            self._result = [self.bounds]
+        elif 'FROM information_schema.columns' in query:
+            self._result = [(name,) for name in self.columns]
+        elif query.startswith('INSERT INTO schema_migrations'):
+            self.applied.append(params[0])
+
+    def fetchall(self):
+        return self._result
+
+    def fetchone(self):
+        return self._result[0]
+
+    def ran(self, fragment):
+        return [s for s in self.statements if fragment in s]
+
+
+def test_apply_migrations_fresh_database():
+    """Test that a fresh database gets the table and its indexes."""
+    cursor = FakeCursor()
+
+    applied = apply_migrations(cursor, partitioned=False)
+
+    assert applied == {1, 2, 4, 5}
+    assert cursor.ran('pg_advisory_xact_lock')
+    assert cursor.ran('CREATE TABLE IF NOT EXISTS fashion_products (')
+    assert cursor.ran('USING BRIN (timestamp)')
+    assert cursor.ran('ON fashion_products (title, size, gender)')
+    assert not cursor.ran('PARTITION BY RANGE')
+    assert cursor.ran('ADD COLUMN IF NOT EXISTS image_dhash CHAR(16)')
+    assert cursor.ran('CREATE TABLE IF NOT EXISTS product_current (')
+    assert cursor.ran('CREATE TABLE IF NOT EXISTS product_price_history (')
+    assert cursor.ran('ON product_price_history (title, size, gender) WHERE valid_to IS NULL')
+
+
+def test_apply_migrations_is_idempotent():
+    """Test that already applied versions are not run again."""
+    cursor = FakeCursor(applied=[1, 2, 4, 5])
+
+    apply_migrations(cursor, partitioned=False)
+
+    assert not cursor.ran('CREATE TABLE IF NOT EXISTS fashion_products (')
+    assert not cursor.ran('INSERT INTO schema_migrations')
+
+
+def test_apply_migrations_partitions_existing_table(mocker):
+    """Test converting an existing table to monthly partitions keeps its rows."""
+    mock_datetime = mocker.patch('utils.schema.datetime')
+    mock_datetime.now.return_value = datetime(2024, 3, 15)
+    cursor = FakeCursor(applied=[1, 2],
+                        bounds=(datetime(2024, 1, 5), datetime(2024, 2, 20)))
+
+    applied = apply_migrations(cursor, partitioned=True)
+
+    assert 3 in applied
+    assert cursor.ran('RENAME TO fashion_products_unpartitioned')
+    assert cursor.ran('PARTITION BY RANGE (timestamp)')
+    assert cursor.ran('PARTITION OF fashion_products DEFAULT')
+    for name in ('p202401', 'p202402', 'p202403'):
+        assert cursor.ran(f'fashion_products_{name} PARTITION OF')
+    copy = cursor.ran('FROM fashion_products_unpartitioned')[0]
+    assert cursor.statements.index(copy) > cursor.statements.index(
+        cursor.ran('fashion_products_p202401 PARTITION OF')[0])
+    assert cursor.ran('DROP TABLE fashion_products_unpartitioned')
+    assert 'image_url' not in copy
+
+
+def test_partitioning_after_image_columns_keeps_them(mocker):
+    """Test that partitioning a table that already has image columns copies them."""
+    mocker.patch('utils.schema.datetime').now.return_value = datetime(2024, 3, 15)
+    cursor = FakeCursor(applied=[1, 2, 4], bounds=(None, None),
+                        columns=['id', 'title', 'image_url', 'image_dhash'])
+
+    apply_migrations(cursor, partitioned=True)
+
+    assert 'image_dhash CHAR(16)' in cursor.ran('PARTITION BY RANGE (timestamp)')[0]
+    copy = cursor.ran('FROM fashion_products_unpartitioned')[0]
+    assert 'image_url, image_dhash' in copy
+    assert 'image_width' not in copy
+
+
+def test_setup_schema_creates_upcoming_partitions(mocker):
+    """Test that a partitioned schema always has this and next month's partitions."""
+    mock_date = mocker.patch('utils.schema.date', wraps=date)
+    mock_date.today.return_value = date(2024, 12, 10)
+    cursor = FakeCursor(applied=[1, 2, 3])
+
+    setup_schema(cursor, partitioned=True)
+
+    assert cursor.ran("fashion_products_p202412 PARTITION OF fashion_products "
+                      "FOR VALUES FROM ('2024-12-01') TO ('2025-01-01')")
+    assert cursor.ran('fashion_products_p202501 PARTITION OF')
+
+
+def test_ensure_monthly_partitions_range():
+    """Test that partitions cover every month of the range."""
+    cursor = FakeCursor()
+
+    created = ensure_monthly_partitions(cursor, date(2023, 11, 20), date(2024, 2, 1))
+
+    assert created == ['fashion_products_p202311', 'fashion_products_p202312',
+                       'fashion_products_p202401', 'fashion_products_p202402']
+
+
+def test_drop_partitions_older_than():
+    """Test that retention detaches and drops only fully expired partitions."""
+    cursor = FakeCursor(partitions=[
+        'fashion_products_default', 'fashion_products_p202401',
+        'fashion_products_p202402', 'fashion_products_p202403'])
+
+    dropped = drop_partitions_older_than(cursor, date(2024, 3, 1))
+
+    assert dropped == ['fashion_products_p202401', 'fashion_products_p202402']
+    assert cursor.ran('DETACH PARTITION fashion_products_p202401')
+    assert not cursor.ran('DROP TABLE fashion_products_default')
+    assert not cursor.ran('DELETE')
+
+
+@pytest.mark.parametrize('months, expected', [
+    (1, date(2024, 3, 1)),
+    (3, date(2024, 1, 1)),
+    (12, date(2023, 4, 1)),
+])
+def test_retention_cutoff(months, expected):
+    """Test the first kept month for a retention window."""
+    assert retention_cutoff(months, today=date(2024, 3, 15)) == expected
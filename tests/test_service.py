@@ -0,0 +1,91 @@
+from utils.service import RunState, parse_duration, serve, start_health_server
+import json
+import threading
+import urllib.error
+import urllib.request
+import pytest
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('1h', 3600), ('30m', 1800), ('45s', 45), ('1h30m', 5400), ('90', 90), (2.5, 2.5),
+])
+def test_parse_duration(text, expected):
+    """Test parsing of interval and jitter strings."""
+    assert parse_duration(text) == expected
+
+
+@pytest.mark.parametrize('text', ['', 'soon', '1x', '1h-5m'])
+def test_parse_duration_invalid(text):
+    """Test that malformed durations are rejected."""
+    with pytest.raises(ValueError):
+        parse_duration(text)
+
+
+def test_serve_runs_never_overlap(mocker):
+    """Test that runs are sequential and waits include the jitter."""
+    mocker.patch('utils.service.random.uniform', return_value=0.5)
+    stop_event = threading.Event()
+    waits = []
+    mocker.patch.object(stop_event, 'wait', side_effect=waits.append)
+    active = []
+
+    def run_once(report):
+        active.append(1)
+        assert len(active) == 1
+        report['rows_loaded'] = 2
+        active.pop()
+        return True
+
+    state = serve(run_once, interval=10, jitter=1, stop_event=stop_event, max_runs=3)
+
+    assert state.runs == 3
+    assert state.failures == 0
+    assert len(waits) == 2
+    assert all(9.5 < wait <= 10.5 for wait in waits)
+    assert state.last_run['report'] == {'rows_loaded': 2}
+
+
+def test_serve_survives_failing_runs():
+    """Test that an exception in one run is recorded and does not stop the loop."""
+    calls = iter([RuntimeError('boom'), False, True])
+
+    def run_once(report):
+        result = next(calls)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    state = serve(run_once, interval=0, max_runs=3)
+
+    assert state.runs == 3
+    assert state.failures == 2
+    assert state.last_run['success'] is True
+
+
+def fetch(port, path):
+    try:
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}{path}', timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_health_server_reports_last_run():
+    """Test the /health and /metrics endpoints."""
+    state = RunState()
+    server = start_health_server(state, port=0)
+    port = server.server_port
+    try:
+        assert fetch(port, '/health') == (200, {'status': 'ok', 'running': False})
+
+        state.run_finished('2024-01-01T00:00:00', 1.23456, False, {'rows_extracted': 0})
+        status, body = fetch(port, '/health')
+        assert (status, body['status']) == (503, 'failing')
+
+        status, metrics = fetch(port, '/metrics')
+        assert status == 200
+        assert metrics['runs'] == 1
+        assert metrics['last_run']['duration_seconds'] == 1.235
+        assert fetch(port, '/missing')[0] == 404
+    finally:
+        server.shutdown()
@@ -0,0 +1,89 @@
+from utils.spill import OutOfCoreTransform, parse_size
+from utils.transform import DEDUP_SUBSET, transform_data
+import pytest
+
+
+def make_products(count, offset=0):
+    return [{
+        'title': f'Product {i}',
+        'price': f'{10 + i % 50}.99',
+        'rating': f'{i % 5}.0',
+        'colors': f'{1 + i % 4}',
+        'size': ['S', 'M', 'L'][i % 3],
+        'gender': ['Men', 'Women', 'Unisex'][i % 3],
+    } for i in range(offset, offset + count)]
+
+
+def collect(spill):
+    parts = list(spill.partitions())
+    return parts, sorted(title for part in parts for title in part['title'])
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('1024', 1024),
+    ('512K', 512 * 1024),
+    ('512m', 512 * 1024 ** 2),
+    ('2G', 2 * 1024 ** 3),
+    ('1.5GiB', int(1.5 * 1024 ** 3)),
+])
+def test_parse_size(text, expected):
+    """Test that sizes with binary unit suffixes are parsed."""
+    assert parse_size(text) == expected
+
+
+def test_parse_size_invalid():
+    """Test that an unparseable size raises ValueError."""
+    with pytest.raises(ValueError):
+        parse_size('lots')
+
+
+def test_out_of_core_matches_transform_data(tmp_path):
+    """Test that spilled partitions hold the same rows as transform_data."""
+    raw = make_products(300)
+    expected = transform_data(raw)
+
+    with OutOfCoreTransform(200_000, str(tmp_path)) as spill:
+        for start in range(0, len(raw), 20):
+            spill.add(raw[start:start + 20])
+        parts, titles = collect(spill)
+
+    assert spill._batches > 1
+    assert titles == sorted(expected['title'])
+    assert all(list(part.columns) == list(expected.columns) for part in parts)
+
+
+def test_out_of_core_dedups_across_batches(tmp_path):
+    """Test that duplicates spilled in different batches are dropped once globally."""
+    with OutOfCoreTransform(100_000, str(tmp_path)) as spill:
+        spill.add(make_products(100))
+        spill.flush()
+        spill.add(make_products(100))
+        spill.add(make_products(50, offset=100))
+        parts, titles = collect(spill)
+
+    assert spill.rows_extracted == 250
+    assert titles == sorted(f'Product {i}' for i in range(150))
+    for part in parts:
+        assert not part.duplicated(subset=DEDUP_SUBSET).any()
+
+
+def test_out_of_core_partitions_fit_memory_limit(tmp_path):
+    """Test that no partition holds more rows than half the memory limit allows."""
+    with OutOfCoreTransform(50_000, str(tmp_path), num_buckets=4) as spill:
+        spill.add(make_products(1000))
+        parts, titles = collect(spill)
+
+    assert len(titles) == 1000
+    assert len(parts) > 1
+    assert max(len(part) for part in parts) <= spill.max_partition_rows
+
+
+def test_out_of_core_close_removes_spill_files(tmp_path):
+    """Test that closing the transform deletes its spill directory."""
+    spill = OutOfCoreTransform(100_000, str(tmp_path))
+    spill.add(make_products(10))
+    spill.flush()
+
+    spill.close()
+
+    assert list(tmp_path.iterdir()) == []
@@ -1,4 +1,5 @@
-from utils.transform import transform_data
+from utils.transform import (transform_data, fill_missing, parse_price_column,
+                             parse_rating_column, parse_colors_column)
 import pandas as pd
 from datetime import datetime
 import pytest
@@ -128,19 +129,12 @@ def test_transform_data_invalid_input(sample_data, mocker):
 
 
 def test_transform_data_exception_handling(sample_data, mocker):
-    """Test transform_data exception handling during DataFrame creation."""
-    mock_logger = mocker.patch('utils.transform.logger')
-    # Mock a specific operation inside the try block to cause an exception
+    """Test that transform_data lets unexpected errors reach the pipeline."""
     mocker.patch('pandas.DataFrame.reindex',
                  side_effect=Exception("Test reindex error"))
 
-    result = transform_data(sample_data["valid_raw_data"])
-
-    # Check that the generic error message is logged
-    mock_logger.error.assert_called_with(
-        "An error occurred during data transformation: Test reindex error")
-    assert isinstance(result, pd.DataFrame)
-    assert result.empty
+    with pytest.raises(Exception, match="Test reindex error"):
+        transform_data(sample_data["valid_raw_data"])
 
 
 def test_transform_data_missing_columns(sample_data, mocker):
@@ -170,19 +164,35 @@ def test_transform_data_missing_columns(sample_data, mocker):
 
 
 def test_transform_data_error_during_deduplication(sample_data, mocker):
-    """Test transform_data with an error during the deduplication step."""
+    """Test that an error during deduplication is raised, not an empty frame."""
     mocker.patch('utils.transform.datetime')
-    mock_logger = mocker.patch('utils.transform.logger')
     mocker.patch('utils.transform.pd.DataFrame.drop_duplicates',
                  side_effect=Exception("Duplication error"))
 
-    result = transform_data(sample_data["valid_raw_data"])
+    with pytest.raises(Exception, match="Duplication error"):
+        transform_data(sample_data["valid_raw_data"])
 
-    # Assert that the correct, generic error message is logged
-    mock_logger.error.assert_called_with(
-        "An error occurred during data transformation: Duplication error")
-    assert isinstance(result, pd.DataFrame)
-    assert result.empty
+
+def test_transform_data_uses_given_timestamp(sample_data):
+    """Test that an explicit timestamp, e.g. from a replayed run, replaces the current time."""
+    result = transform_data(sample_data["valid_raw_data"],
+                            timestamp=sample_data["test_datetime_str"])
+
+    assert (result['timestamp'] == sample_data["test_datetime_str"]).all()
+
+
+def test_transform_data_without_fill_keeps_missing_values(sample_data, mocker):
+    """Test that fill=False leaves gaps for validation and fill_missing fills them later."""
+    mocker.patch('utils.transform.datetime')
+    incomplete_data = [{'title': 'Test Product 1', 'price': '19.99', 'gender': 'Men'}]
+
+    result = transform_data(incomplete_data, fill=False)
+
+    assert result[['rating', 'colors', 'size']].isna().all(axis=None)
+    filled = fill_missing(result)
+    assert filled['rating'].iloc[0] == 0.0
+    assert filled['colors'].iloc[0] == 1
+    assert filled['size'].iloc[0] == 'One Size'
 
 
 def test_transform_data_column_selection(mocker):
@@ -207,3 +217,49 @@ def test_transform_data_column_selection(mocker):
     expected_columns = ['title', 'price', 'rating',
                         'colors', 'size', 'gender', 'timestamp']
     assert list(result.columns) == expected_columns
+
+
+def test_column_parsers_handle_raw_and_numeric_values():
+    """Test vectorized parsing of mixed raw strings, numbers and missing values."""
+    prices = pd.Series(['$1,234.50', '19.99', 5.0, None, 'invalid', '$1,234.50'])
+    ratings = pd.Series(['Rating: ⭐ 4.8 / 5', 'Rating: ⭐ Invalid Rating / 5',
+                         '3.5', None, 'Rating: ⭐ 4.8 / 5'])
+    colors = pd.Series(['3 Colors', '2', 7, 'many', '3.5 Colors', None])
+
+    assert parse_price_column(prices).tolist()[:3] == [1234.5, 19.99, 5.0]
+    assert parse_price_column(prices).isna().tolist() == [
+        False, False, False, True, True, False]
+    parsed_ratings = parse_rating_column(ratings)
+    assert parsed_ratings[[0, 2, 4]].tolist() == [4.8, 3.5, 4.8]
+    assert parsed_ratings[[1, 3]].isna().all()
+    assert parse_colors_column(colors)[:3].tolist() == [3, 2, 7]
+    assert parse_colors_column(colors)[3:].isna().all()
+
+
+def test_column_parsers_keep_index():
+    """Test that parsed columns align with the frame they came from."""
+    values = pd.Series(['$10', '$20'], index=[5, 9])
+
+    result = parse_price_column(values)
+
+    assert result.index.tolist() == [5, 9]
+    assert result.tolist() == [10.0, 20.0]
+
+
+def test_transform_data_parses_raw_detail_strings(mocker):
+    """Test that transform_data accepts unparsed detail text."""
+    mocker.patch('utils.transform.datetime')
+    raw_data = [{
+        'title': 'Raw Product',
+        'price': '$10.00',
+        'rating': 'Rating: ⭐ 4.8 / 5',
+        'colors': '3 Colors',
+        'size': 'M',
+        'gender': 'Men'
+    }]
+
+    result = transform_data(raw_data)
+
+    assert result['price'].iloc[0] == 10.0 * 16000
+    assert result['rating'].iloc[0] == 4.8
+    assert result['colors'].iloc[0] == 3
@@ -0,0 +1,95 @@
+from utils.validate import validate_data, RULES, Rule, one_of
+from utils.transform import transform_data
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def transformed():
+    """Provides a transformed frame with one row breaking each rule."""
+    return pd.DataFrame({
+        'title': ['Good', 'Free', 'Overrated', 'No Colors', 'Odd Size', 'Odd Gender', 'Worst'],
+        'price': [160000.0, 0.0, 160000.0, 160000.0, 160000.0, 160000.0, -5.0],
+        'rating': [4.5, 3.0, 5.5, 4.0, 4.0, 4.0, -1.0],
+        'colors': [3, 2, 1, 0, 2, 2, 0],
+        'size': ['M', 'L', 'S', 'XL', 'Huge', 'One Size', 'Huge'],
+        'gender': ['Men', 'Women', 'Unisex', 'Men', 'Women', 'Robots', 'Robots'],
+        'timestamp': ['2023-01-01 12:00:00'] * 7
+    })
+
+
+def test_validate_data_splits_rows(transformed):
+    """Test that only rows breaking a rule are quarantined."""
+    valid, quarantined, counts = validate_data(transformed)
+
+    assert valid['title'].tolist() == ['Good']
+    assert len(valid) + len(quarantined) == len(transformed)
+    assert list(valid.columns) == list(transformed.columns)
+    assert counts == {
+        'price_range': 2,
+        'rating_range': 2,
+        'colors_positive': 2,
+        'size_allowed': 2,
+        'gender_allowed': 2,
+    }
+
+
+def test_validate_data_records_failed_rules(transformed):
+    """Test that quarantined rows list every rule they broke."""
+    _, quarantined, _ = validate_data(transformed)
+    reasons = dict(zip(quarantined['title'], quarantined['failed_rules']))
+
+    assert reasons['Free'] == 'price_range'
+    assert reasons['Overrated'] == 'rating_range'
+    assert reasons['Odd Size'] == 'size_allowed'
+    assert reasons['Worst'] == ('price_range,rating_range,colors_positive,'
+                                'size_allowed,gender_allowed')
+
+
+def test_validate_data_treats_missing_values_as_failures():
+    """Test that NaN values fail their rules instead of slipping through."""
+    data = pd.DataFrame({'price': [np.nan], 'rating': [np.nan], 'colors': [np.nan],
+                         'size': [None], 'gender': [None]})
+
+    valid, quarantined, counts = validate_data(data)
+
+    assert valid.empty
+    assert all(count == 1 for count in counts.values())
+
+
+def test_validate_data_sees_unfilled_scraped_values():
+    """Test that unparseable values are caught before transform fills them in."""
+    raw = [
+        {'title': 'Good', 'price': '$10.00', 'rating': 'Rating: ⭐ 4.5 / 5',
+         'colors': '3 Colors', 'size': 'M', 'gender': 'Men'},
+        {'title': 'Broken', 'price': '$10.00', 'rating': 'Invalid Rating',
+         'colors': 'Many', 'size': None, 'gender': 'Men'},
+    ]
+
+    valid, quarantined, counts = validate_data(transform_data(raw, fill=False))
+
+    assert valid['title'].tolist() == ['Good']
+    assert quarantined['failed_rules'].tolist() == [
+        'rating_range,colors_positive,size_allowed']
+
+
+def test_validate_data_custom_rules(transformed):
+    """Test that the rule set is declarative and can be replaced."""
+    rules = [Rule('men_only', one_of('gender', ['Men']))]
+
+    valid, quarantined, counts = validate_data(transformed, rules)
+
+    assert valid['title'].tolist() == ['Good', 'No Colors']
+    assert counts == {'men_only': 5}
+
+
+def test_validate_data_all_valid(transformed):
+    """Test that a clean frame passes through untouched."""
+    clean = transformed.iloc[:1]
+
+    valid, quarantined, counts = validate_data(clean)
+
+    assert valid.equals(clean)
+    assert quarantined.empty
+    assert set(counts) == {rule.name for rule in RULES}
@@ -0,0 +1,146 @@
+import json
+import logging
+import mmap
+import os
+import threading
+from datetime import datetime
+
+import zstandard
+
+from utils.extract import extract_products_from_html
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_FILE = 'pages.zst'
+INDEX_FILE = 'index.jsonl'
+
+
+class PageArchive:
+    """
+    Append-only archive of the pages fetched during one run.
+
+    Every page is written as its own zstd frame at the end of a segment
+    file, and one JSON line per page in the index records the frame's
+    offset and length, so any page can be read back without decompressing
+    the others. Safe to share between crawl threads.
+    """
+
+    def __init__(self, root: str, run_id: str = None, level: int = 3):
+        self.run_id = run_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.directory = os.path.join(root, self.run_id)
+        os.makedirs(self.directory, exist_ok=True)
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._segment = open(os.path.join(self.directory, SEGMENT_FILE), 'ab')
+        self._index = open(os.path.join(self.directory, INDEX_FILE), 'a',
+                           encoding='utf-8')
+        self._lock = threading.Lock()
+        self.pages = 0
+
+    def append(self, url: str, html: str, page_num: int = None, source: int = None):
+        frame = self._compressor.compress(html.encode('utf-8'))
+        with self._lock:
+            offset = self._segment.tell()
+            self._segment.write(frame)
+            self._segment.flush()
+            self._index.write(json.dumps({
+                'url': url,
+                'source': source,
+                'page': page_num,
+                'offset': offset,
+                'length': len(frame),
+                'fetched_at': datetime.now().isoformat(timespec='seconds'),
+            }) + '\n')
+            self._index.flush()
+            self.pages += 1
+
+    def close(self):
+        with self._lock:
+            self._segment.close()
+            self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def list_runs(root: str) -> list:
+    if not os.path.isdir(root):
+        return []
+    return sorted(name for name in os.listdir(root)
+                  if os.path.exists(os.path.join(root, name, INDEX_FILE)))
+
+
+class ArchiveReader:
+    """Reads an archived run back through a memory-mapped segment file."""
+
+    def __init__(self, root: str, run_id: str = 'latest'):
+        if run_id == 'latest':
+            runs = list_runs(root)
+            if not runs:
+                raise FileNotFoundError(f"No archived runs in {root}")
+            run_id = runs[-1]
+        self.run_id = run_id
+        self.directory = os.path.join(root, run_id)
+        with open(os.path.join(self.directory, INDEX_FILE), encoding='utf-8') as f:
+            self.entries = [json.loads(line) for line in f if line.strip()]
+        # Crawl threads append in completion order; replay in the (source,
+        # page) order crawl_sources uses, so dedup keeps the same rows.
+        if all(entry.get('source') is not None and entry.get('page') is not None
+               for entry in self.entries):
+            self.entries.sort(key=lambda entry: (entry['source'], entry['page']))
+        self._decompressor = zstandard.ZstdDecompressor()
+        self._file = open(os.path.join(self.directory, SEGMENT_FILE), 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) \
+            if size else None
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def fetched_at(self):
+        """When the archived run finished fetching, as transform_data's timestamp format."""
+        if not self.entries:
+            return None
+        fetched_at = datetime.fromisoformat(
+            max(entry['fetched_at'] for entry in self.entries))
+        return fetched_at.strftime('%Y-%m-%d %H:%M:%S')
+
+    def read(self, entry: dict) -> str:
+        start = entry['offset']
+        frame = self._map[start:start + entry['length']]
+        return self._decompressor.decompress(frame).decode('utf-8')
+
+    def __iter__(self):
+        for entry in self.entries:
+            yield entry, self.read(entry)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_archived_pages(reader: ArchiveReader):
+    """Yield the products parsed from each archived page, in archive order."""
+    for entry, html in reader:
+        yield extract_products_from_html(html, entry['url'])
+
+
+def extract_archived_products(reader: ArchiveReader) -> list:
+    """Re-run the parse stage over every archived page, without any network access."""
+    all_products = []
+    for products in iter_archived_pages(reader):
+        all_products.extend(products)
+    logger.info(
+        f"Total products extracted from archived run {reader.run_id} "
+        f"({len(reader)} pages): {len(all_products)}")
+    return all_products
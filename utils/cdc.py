@@ -0,0 +1,113 @@
+import logging
+
+import numpy as np
+import pandas as pd
+from psycopg2 import extras
+
+from utils.schema import CURRENT_TABLE, HISTORY_TABLE
+
+logger = logging.getLogger(__name__)
+
+# A product is identified by its key; a change in any tracked attribute
+# closes its open history row and opens a new one.
+CDC_KEY = ['title', 'size', 'gender']
+CDC_ATTRIBUTES = ['price', 'rating', 'colors']
+# Arbitrary key so concurrent CDC loads never diff against the same state at once.
+CDC_LOCK_ID = 72150332
+
+
+def read_current(cursor, keys: pd.DataFrame) -> pd.DataFrame:
+    """Current rows of the products in `keys`, joined on a VALUES list instead of reading the whole table."""
+    columns = CDC_KEY + CDC_ATTRIBUTES + ['valid_from']
+    rows = []
+    if not keys.empty:
+        rows = extras.execute_values(cursor, f'''
+            SELECT {', '.join(f'c.{column}' for column in columns)}
+            FROM {CURRENT_TABLE} AS c
+            JOIN (VALUES %s) AS k (title, size, gender)
+              ON c.title = k.title AND c.size = k.size AND c.gender = k.gender
+            ''', _rows(keys), fetch=True)
+    current = pd.DataFrame(rows, columns=columns)
+    for column in CDC_ATTRIBUTES:
+        current[column] = pd.to_numeric(current[column], errors='coerce').astype(float)
+    return current
+
+
+def _same(left: pd.Series, right: pd.Series) -> np.ndarray:
+    a = pd.to_numeric(left, errors='coerce').to_numpy(dtype=float)
+    b = pd.to_numeric(right, errors='coerce').to_numpy(dtype=float)
+    return np.isclose(a, b, rtol=0, atol=1e-6, equal_nan=True)
+
+
+def diff_against_current(incoming: pd.DataFrame, current: pd.DataFrame,
+                         valid_from) -> tuple:
+    """
+    Compare a transformed frame with the current state in one vectorized merge.
+
+    Returns (new, changed): products whose key is not current yet, and
+    products whose price, rating or colors differ from their current row.
+    Only the first row per key counts (like transform_data's dedup), a key
+    already written at `valid_from` (an earlier part of the same run) is
+    left alone, and current products missing from `incoming` are kept, since
+    a crawl that stopped early says nothing about them.
+    """
+    incoming = incoming.drop_duplicates(subset=CDC_KEY)[CDC_KEY + CDC_ATTRIBUTES]
+    merged = incoming.merge(current, on=CDC_KEY, how='left',
+                            suffixes=('', '_current'), indicator=True)
+    known = (merged['_merge'] == 'both').to_numpy()
+
+    unchanged = np.ones(len(merged), dtype=bool)
+    for column in CDC_ATTRIBUTES:
+        unchanged &= _same(merged[column], merged[f'{column}_current'])
+    written_now = (pd.to_datetime(merged['valid_from'])
+                   == pd.Timestamp(valid_from)).to_numpy()
+
+    columns = CDC_KEY + CDC_ATTRIBUTES
+    new = merged.loc[~known, columns]
+    changed = merged.loc[known & ~unchanged & ~written_now, columns]
+    return new.reset_index(drop=True), changed.reset_index(drop=True)
+
+
+def _rows(frame: pd.DataFrame, *extra) -> list:
+    values = frame.astype(object).where(frame.notna(), None).to_numpy()
+    return [tuple(row) + extra for row in values]
+
+
+def apply_changes(cursor, new: pd.DataFrame, changed: pd.DataFrame, valid_from):
+    """Close the history rows of changed products, then record new and changed ones."""
+    if not changed.empty:
+        extras.execute_values(cursor, f'''
+            UPDATE {HISTORY_TABLE} AS h SET valid_to = v.valid_to
+            FROM (VALUES %s) AS v (title, size, gender, valid_to)
+            WHERE h.title = v.title AND h.size = v.size AND h.gender = v.gender
+              AND h.valid_to IS NULL
+            ''', _rows(changed[CDC_KEY], valid_from),
+            template='(%s, %s, %s, %s::timestamp)')
+
+    rows = _rows(pd.concat([new, changed], ignore_index=True), valid_from)
+    if not rows:
+        return
+    columns = ', '.join(CDC_KEY + CDC_ATTRIBUTES + ['valid_from'])
+    extras.execute_values(
+        cursor, f"INSERT INTO {HISTORY_TABLE} ({columns}) VALUES %s", rows)
+    extras.execute_values(cursor, f'''
+        INSERT INTO {CURRENT_TABLE} ({columns}) VALUES %s
+        ON CONFLICT (title, size, gender) DO UPDATE SET
+            price = EXCLUDED.price, rating = EXCLUDED.rating,
+            colors = EXCLUDED.colors, valid_from = EXCLUDED.valid_from
+        ''', rows)
+
+
+def load_changes(cursor, data: pd.DataFrame) -> dict:
+    """Diff `data` against product_current and write only what changed. Returns row counts."""
+    valid_from = pd.Timestamp(data['timestamp'].iloc[0]).to_pydatetime()
+    cursor.execute("SELECT pg_advisory_xact_lock(%s)", (CDC_LOCK_ID,))
+    current = read_current(cursor, data.drop_duplicates(subset=CDC_KEY)[CDC_KEY])
+    new, changed = diff_against_current(data, current, valid_from)
+    apply_changes(cursor, new, changed, valid_from)
+    counts = {'new': len(new), 'changed': len(changed),
+              'unchanged': data.drop_duplicates(subset=CDC_KEY).shape[0]
+              - len(new) - len(changed)}
+    logger.info(f"CDC load: {counts['new']} new, {counts['changed']} changed, "
+                f"{counts['unchanged']} unchanged products")
+    return counts
@@ -0,0 +1,197 @@
+import logging
+import os
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+import pandas as pd
+import psycopg2
+from psycopg2 import extras, pool as pg_pool
+
+from utils.load import postgres_connection_params, rows_for_insert
+from utils.schema import (IMAGE_COLUMNS, drop_partitions_older_than,
+                          ensure_current_partitions, partitioning_enabled,
+                          retention_cutoff, setup_schema)
+
+logger = logging.getLogger(__name__)
+
+INSERT_COLUMNS = ['title', 'price', 'rating',
+                  'colors', 'size', 'gender', 'timestamp']
+INSERT_STATEMENT = 'fashion_products_insert'
+PREPARE_INSERT = f'''
+PREPARE {INSERT_STATEMENT} (varchar, numeric, numeric, integer, varchar, varchar, timestamp) AS
+INSERT INTO fashion_products ({', '.join(INSERT_COLUMNS)})
+VALUES ($1, $2, $3, $4, $5, $6, $7)
+'''
+EXECUTE_INSERT = f"EXECUTE {INSERT_STATEMENT} (%s, %s, %s, %s, %s, %s, %s)"
+
+# Used instead when the frame went through image enrichment (schema migration 4).
+IMAGE_INSERT_COLUMNS = INSERT_COLUMNS + list(IMAGE_COLUMNS)
+IMAGE_INSERT_STATEMENT = 'fashion_products_insert_images'
+PREPARE_IMAGE_INSERT = f'''
+PREPARE {IMAGE_INSERT_STATEMENT} (varchar, numeric, numeric, integer, varchar, varchar, timestamp,
+                                  text, integer, integer, integer, char(16)) AS
+INSERT INTO fashion_products ({', '.join(IMAGE_INSERT_COLUMNS)})
+VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12)
+'''
+EXECUTE_IMAGE_INSERT = f"EXECUTE {IMAGE_INSERT_STATEMENT} ({', '.join(['%s'] * 12)})"
+
+
+class PostgresPool:
+    """
+    Thread-safe pool of warm PostgreSQL connections.
+
+    The schema is set up once when the pool is created, each connection
+    prepares the insert statement the first time it is used, and idle
+    connections are health-checked before being handed out again.
+    """
+
+    def __init__(self, minconn=1, maxconn=4, health_check_interval=30.0,
+                 page_size=500, partitioned=None):
+        if minconn < 1 or maxconn < minconn:
+            raise ValueError("expected 1 <= minconn <= maxconn")
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.health_check_interval = health_check_interval
+        self.page_size = page_size
+        self.partitioned = partitioning_enabled() if partitioned is None else partitioned
+        self._pool = pg_pool.ThreadedConnectionPool(
+            minconn, maxconn, **postgres_connection_params())
+        self._lock = threading.Lock()
+        # Connection -> names of the statements prepared on it.
+        self._prepared = weakref.WeakKeyDictionary()
+        self._last_used = weakref.WeakKeyDictionary()
+        self._in_use = 0
+        self._stats = {
+            'checkouts': 0,
+            'reconnects': 0,
+            'health_check_failures': 0,
+            'statements_prepared': 0,
+            'rows_inserted': 0,
+        }
+        self.setup_schema()
+
+    @classmethod
+    def from_env(cls, maxconn=None):
+        """Create a pool sized by DB_POOL_MIN / DB_POOL_SIZE (or `maxconn`)."""
+        maxconn = maxconn or int(os.getenv('DB_POOL_SIZE', '4'))
+        minconn = min(int(os.getenv('DB_POOL_MIN', '1')), maxconn)
+        return cls(minconn=minconn, maxconn=maxconn)
+
+    def setup_schema(self):
+        with self.connection() as conn:
+            with conn.cursor() as cursor:
+                setup_schema(cursor, self.partitioned)
+
+    def ensure_partitions(self) -> list:
+        """Create this and next month's partitions; a long-lived pool outlives the month it started in."""
+        with self.connection() as conn:
+            with conn.cursor() as cursor:
+                return ensure_current_partitions(cursor)
+
+    def drop_expired_partitions(self, months: int) -> list:
+        """Retention job: drop monthly partitions older than `months` months."""
+        with self.connection() as conn:
+            with conn.cursor() as cursor:
+                return drop_partitions_older_than(cursor, retention_cutoff(months))
+
+    def _is_healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        last_used = self._last_used.get(conn, 0.0)
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _checkout(self):
+        conn = self._pool.getconn()
+        if not self._is_healthy(conn):
+            logger.warning("Discarding unhealthy PostgreSQL connection")
+            with self._lock:
+                self._stats['health_check_failures'] += 1
+                self._stats['reconnects'] += 1
+            self._pool.putconn(conn, close=True)
+            conn = self._pool.getconn()
+        with self._lock:
+            self._stats['checkouts'] += 1
+            self._in_use += 1
+        return conn
+
+    def _release(self, conn, broken=False):
+        with self._lock:
+            self._in_use -= 1
+        if broken:
+            self._prepared.pop(conn, None)
+        else:
+            self._last_used[conn] = time.monotonic()
+        self._pool.putconn(conn, close=broken)
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection, committing on success and rolling back on error."""
+        conn = self._checkout()
+        broken = False
+        try:
+            yield conn
+            conn.commit()
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._release(conn, broken=broken or bool(conn.closed))
+
+    def _prepare(self, conn, cursor, name=INSERT_STATEMENT, statement=PREPARE_INSERT):
+        prepared = self._prepared.setdefault(conn, set())
+        if name in prepared:
+            return
+        cursor.execute(statement)
+        prepared.add(name)
+        with self._lock:
+            self._stats['statements_prepared'] += 1
+
+    def insert_products(self, data: pd.DataFrame) -> int:
+        """Insert rows into fashion_products through the prepared statement."""
+        if 'image_url' in data.columns:
+            columns, name = IMAGE_INSERT_COLUMNS, IMAGE_INSERT_STATEMENT
+            prepare, execute = PREPARE_IMAGE_INSERT, EXECUTE_IMAGE_INSERT
+        else:
+            columns, name = INSERT_COLUMNS, INSERT_STATEMENT
+            prepare, execute = PREPARE_INSERT, EXECUTE_INSERT
+        values = rows_for_insert(data.reindex(columns=columns))
+        with self.connection() as conn:
+            with conn.cursor() as cursor:
+                self._prepare(conn, cursor, name, prepare)
+                extras.execute_batch(cursor, execute, values,
+                                     page_size=self.page_size)
+        with self._lock:
+            self._stats['rows_inserted'] += len(values)
+        return len(values)
+
+    def health_check(self) -> bool:
+        """Run a round trip on a pooled connection."""
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+            return True
+        except psycopg2.Error as e:
+            logger.error(f"PostgreSQL health check failed: {e}")
+            return False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, in_use=self._in_use,
+                        minconn=self.minconn, maxconn=self.maxconn)
+
+    def close(self):
+        self._pool.closeall()
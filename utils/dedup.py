@@ -0,0 +1,134 @@
+import logging
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.transform import DEDUP_SUBSET
+
+logger = logging.getLogger(__name__)
+
+# Same natural key transform_data deduplicates on within a run.
+DEDUP_COLUMNS = DEDUP_SUBSET
+
+
+def row_hashes(data: pd.DataFrame, columns=DEDUP_COLUMNS) -> np.ndarray:
+    """Vectorized 64-bit hash of each row's natural key."""
+    return pd.util.hash_pandas_object(
+        data[columns], index=False).to_numpy(dtype=np.uint64)
+
+
+class BloomFilter:
+    """Bit-packed Bloom filter over 64-bit hashes (double hashing, numpy-vectorized)."""
+
+    def __init__(self, num_bits: int, num_hashes: int, capacity: int = None):
+        self.capacity = capacity
+        self.num_bits = max(int(num_bits), 8)
+        self.num_hashes = max(int(num_hashes), 1)
+        self.bits = np.zeros((self.num_bits + 7) // 8, dtype=np.uint8)
+        self.count = 0
+
+    @classmethod
+    def for_capacity(cls, capacity: int, error_rate: float = 0.01):
+        capacity = max(int(capacity), 1)
+        num_bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        num_hashes = round(num_bits / capacity * math.log(2))
+        return cls(num_bits, num_hashes, capacity)
+
+    def _positions(self, hashes: np.ndarray) -> np.ndarray:
+        h1 = hashes & np.uint64(0xFFFFFFFF)
+        h2 = (hashes >> np.uint64(32)) | np.uint64(1)
+        steps = np.arange(self.num_hashes, dtype=np.uint64)
+        return (h1[:, None] + steps[None, :] * h2[:, None]) % np.uint64(self.num_bits)
+
+    def add(self, hashes: np.ndarray):
+        positions = self._positions(hashes).ravel()
+        np.bitwise_or.at(self.bits, positions >> np.uint64(3),
+                         (np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8)))
+        self.count += len(hashes)
+
+    def might_contain(self, hashes: np.ndarray) -> np.ndarray:
+        if len(hashes) == 0:
+            return np.zeros(0, dtype=bool)
+        positions = self._positions(hashes)
+        bytes_ = self.bits[positions >> np.uint64(3)]
+        bits = (bytes_ >> (positions & np.uint64(7)).astype(np.uint8)) & np.uint8(1)
+        return bits.all(axis=1)
+
+
+class DedupIndex:
+    """
+    Persistent set of row hashes for rows already loaded by earlier runs.
+
+    Hashes are kept as a sorted uint64 array in a .npy file, so membership is
+    one `np.searchsorted` over the whole batch. An optional in-memory Bloom
+    filter, rebuilt on open, answers most lookups for new rows without
+    touching the sorted array.
+    """
+
+    def __init__(self, path: str, use_bloom: bool = True, error_rate: float = 0.01):
+        self.path = path
+        self.use_bloom = use_bloom
+        self.error_rate = error_rate
+        if os.path.exists(path):
+            self.hashes = np.load(path).astype(np.uint64)
+        else:
+            self.hashes = np.empty(0, dtype=np.uint64)
+        self.dirty = False
+        self.bloom = None
+        if use_bloom:
+            self._rebuild_bloom()
+        logger.info(f"Dedup index {path} opened with {len(self.hashes)} hashes")
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def _rebuild_bloom(self):
+        self.bloom = BloomFilter.for_capacity(
+            max(2 * len(self.hashes), 1024), self.error_rate)
+        self.bloom.add(self.hashes)
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        """Boolean mask of the hashes already present in the index."""
+        seen = np.zeros(len(hashes), dtype=bool)
+        if not len(hashes) or not len(self.hashes):
+            return seen
+        if self.bloom is not None:
+            candidates = np.flatnonzero(self.bloom.might_contain(hashes))
+        else:
+            candidates = np.arange(len(hashes))
+        if candidates.size:
+            lookup = hashes[candidates]
+            positions = np.searchsorted(self.hashes, lookup)
+            positions[positions == len(self.hashes)] = 0
+            seen[candidates] = self.hashes[positions] == lookup
+        return seen
+
+    def filter_new(self, data: pd.DataFrame, columns=DEDUP_COLUMNS):
+        """Return the rows not seen by earlier runs and their hashes."""
+        if data.empty:
+            return data, np.empty(0, dtype=np.uint64)
+        hashes = row_hashes(data, columns)
+        new = ~self.contains(hashes)
+        return data[new], hashes[new]
+
+    def add(self, hashes: np.ndarray):
+        hashes = hashes.astype(np.uint64)
+        if len(hashes):
+            self.dirty = True
+        self.hashes = np.union1d(self.hashes, hashes)
+        if self.use_bloom:
+            if len(self.hashes) > self.bloom.capacity:
+                self._rebuild_bloom()
+            else:
+                self.bloom.add(hashes)
+
+    def save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, self.hashes)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
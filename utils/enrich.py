@@ -0,0 +1,177 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+from utils.extract import fetch_bytes
+
+logger = logging.getLogger(__name__)
+
+METADATA_COLUMNS = ['image_bytes', 'image_width', 'image_height', 'image_dhash']
+DEFAULT_WORKERS = 8
+HASH_SIZE = 8
+
+
+def dhash(image, hash_size=HASH_SIZE) -> str:
+    """
+    Difference hash of an image as a hex string.
+
+    Near-identical pictures (resized, recompressed) get the same or a very
+    close hash, so it flags duplicate products listed under different URLs.
+    """
+    gray = image.convert('L').resize((hash_size + 1, hash_size), Image.LANCZOS)
+    pixels = np.asarray(gray, dtype=np.int16)
+    bits = pixels[:, 1:] > pixels[:, :-1]
+    return np.packbits(bits.flatten()).tobytes().hex()
+
+
+def image_metadata(content: bytes) -> dict:
+    """Size, dimensions and dHash of an image; dimensions and hash are None if it cannot be decoded."""
+    metadata = {'image_bytes': len(content), 'image_width': None,
+                'image_height': None, 'image_dhash': None}
+    try:
+        with Image.open(io.BytesIO(content)) as image:
+            metadata['image_width'], metadata['image_height'] = image.size
+            metadata['image_dhash'] = dhash(image)
+    except Exception as e:
+        logger.warning(f"Could not decode image ({len(content)} bytes): {e}")
+    return metadata
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _write_atomic(path, text):
+    # Written to a temp file and renamed, so concurrent readers never see a partial file.
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+class ImageCache:
+    """
+    On-disk, content-addressed cache of image metadata.
+
+    `objects/<sha256 of the image bytes>.json` holds the metadata and
+    `refs/<sha256 of the URL>` names the object a URL resolved to, so a URL
+    seen in any earlier run is never fetched again and URLs serving the
+    same bytes share one object.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._objects = os.path.join(root, 'objects')
+        self._refs = os.path.join(root, 'refs')
+        os.makedirs(self._objects, exist_ok=True)
+        os.makedirs(self._refs, exist_ok=True)
+
+    def _ref_path(self, url):
+        return os.path.join(self._refs, _digest(url.encode('utf-8')))
+
+    def _object_path(self, digest):
+        return os.path.join(self._objects, f"{digest}.json")
+
+    def get(self, url: str):
+        try:
+            with open(self._ref_path(url), encoding='utf-8') as f:
+                digest = f.read().strip()
+            with open(self._object_path(digest), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, url: str, content: bytes, metadata: dict) -> str:
+        digest = _digest(content)
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            _write_atomic(path, json.dumps(dict(metadata, sha256=digest)))
+        _write_atomic(self._ref_path(url), digest)
+        return digest
+
+
+def _fetch_metadata(url, cache, timeout):
+    content = fetch_bytes(url, timeout=timeout)
+    if content is None:
+        return None
+    metadata = image_metadata(content)
+    if cache is not None:
+        cache.put(url, content, metadata)
+    return metadata
+
+
+def enrich_images(data: pd.DataFrame, cache: ImageCache = None,
+                  max_workers: int = DEFAULT_WORKERS, timeout: float = 10, report: dict = None,
+                  fetch: bool = True) -> pd.DataFrame:
+    """
+    Add image metadata columns to a frame that kept `image_url`.
+
+    Each distinct URL is looked up once: cached URLs are answered from disk
+    and the rest are fetched by at most `max_workers` threads. URLs are made
+    absolute when the page is parsed; any that are not http(s) are counted
+    and skipped. Images that cannot be fetched leave
+    their metadata columns empty rather than failing the run. With
+    `fetch=False` (replays) only the cache is used and uncached URLs are
+    skipped.
+    """
+    data = data.copy()
+    urls = data['image_url']
+
+    distinct = [url for url in pd.unique(urls.dropna()) if url != '']
+    unique = [url for url in distinct
+              if isinstance(url, str) and url.startswith(('http://', 'https://'))]
+    if len(unique) < len(distinct):
+        logger.warning(f"Skipped {len(distinct) - len(unique)} image URLs "
+                       f"that are not absolute http(s) URLs")
+    results, to_fetch = {}, []
+    for url in unique:
+        hit = cache.get(url) if cache is not None else None
+        if hit is not None:
+            results[url] = hit
+        else:
+            to_fetch.append(url)
+
+    cached, skipped = len(unique) - len(to_fetch), 0
+    if not fetch:
+        skipped, to_fetch = len(to_fetch), []
+    if to_fetch:
+        with ThreadPoolExecutor(max_workers=max_workers,
+                                thread_name_prefix='image-fetch') as executor:
+            fetched = executor.map(
+                lambda url: _fetch_metadata(url, cache, timeout), to_fetch)
+            for url, metadata in zip(to_fetch, fetched):
+                if metadata is not None:
+                    results[url] = metadata
+
+    if report is not None:
+        # Counts add up across the partitions of a streamed run.
+        counts = report.setdefault(
+            'images', {'unique': 0, 'cached': 0, 'fetched': 0, 'failed': 0,
+                       'skipped': 0})
+        fetched = sum(1 for url in to_fetch if url in results)
+        counts['unique'] += len(unique)
+        counts['cached'] += cached
+        counts['fetched'] += fetched
+        counts['failed'] += len(to_fetch) - fetched
+        counts['skipped'] += skipped
+    logger.info(f"Enriched {len(results)} of {len(unique)} distinct images "
+                f"({len(to_fetch)} fetched, {cached} from cache, {skipped} skipped)")
+
+    metadata = pd.DataFrame.from_dict(results, orient='index').reindex(
+        columns=METADATA_COLUMNS)
+    joined = metadata.reindex(urls.to_numpy())
+    for column in METADATA_COLUMNS:
+        values = joined[column].to_numpy()
+        if column == 'image_dhash':
+            data[column] = pd.Series(values, index=data.index, dtype=object)
+        else:
+            data[column] = pd.array(pd.to_numeric(values), dtype='Int64')
+    return data
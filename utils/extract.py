@@ -3,17 +3,32 @@ from bs4 import BeautifulSoup
 import logging
 import time
 import random
+import re
+from functools import lru_cache, wraps
+from urllib.parse import urljoin
+
+from utils.log import SAMPLED
+from utils.product import Product
 
-# Logging setup
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
+# Optional persistent session (keep-alive connection pool), see set_http_session.
+_http_session = None
+
+PRICE_PATTERN = re.compile(r'\$?(\d+(?:,\d{3})*(?:\.\d+)?)')
+RATING_PATTERN = re.compile(r'⭐\s*(\d+(?:\.\d+)?)\s*/')
+# Only a whole leading integer counts: '3.5 Colors' and '3Colors' are unparsed.
+COLORS_PATTERN = re.compile(r'^\s*([+-]?\d+)(?:\s|$)')
+PARSE_CACHE_SIZE = 4096
+REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
 
 def parse_price(price_text):
     """Convert price string to float."""
+    # Prices are nearly unique per card, so neither a memo nor a regex pays
+    # off here; PRICE_PATTERN is used by the vectorized column parser.
     try:
         price_text = price_text.replace('$', '').replace(',', '').strip()
         return float(price_text)
@@ -21,30 +36,51 @@ def parse_price(price_text):
         return None
 
 
+def _memoized(parser):
+    """LRU-cache a detail parser, still returning None for unhashable input."""
+    cached = lru_cache(maxsize=PARSE_CACHE_SIZE)(parser)
+
+    @wraps(parser)
+    def wrapper(detail_text):
+        try:
+            return cached(detail_text)
+        except TypeError:
+            return None
+
+    wrapper.cache_info = cached.cache_info
+    wrapper.cache_clear = cached.cache_clear
+    return wrapper
+
+
+@_memoized
 def parse_rating(detail_text):
     """Extract and convert rating from detail text."""
     try:
+        match = RATING_PATTERN.search(detail_text)
+        if match:
+            return float(match.group(1))
         rating_text = detail_text.split('⭐')[1].split('/')[0].strip()
         return None if rating_text == 'Invalid Rating' else float(rating_text)
     except Exception:
         return None
 
 
+@_memoized
 def parse_colors(detail_text):
     """Extract and convert colors from detail text."""
-    try:
-        return int(detail_text.split()[0])
-    except Exception:
-        return None
+    match = COLORS_PATTERN.match(detail_text) if isinstance(
+        detail_text, str) else None
+    return int(match.group(1)) if match else None
 
 
-def parse_product_card(card):
-    """Extract product info from a single product card."""
+def parse_product_card(card, url=None):
+    """Extract product info from a single product card; relative image URLs are resolved against the page `url`."""
     product = {}
     # Image
     img_tag = card.select_one('img.collection-image')
     if img_tag:
-        product['image_url'] = img_tag.get('src', '')
+        src = img_tag.get('src', '')
+        product['image_url'] = urljoin(url, src) if url and src else src
         product['product_alt'] = img_tag.get('alt', '')
     # Title
     title_tag = card.select_one('h3.product-title')
@@ -68,29 +104,34 @@ def parse_product_card(card):
     return product
 
 
-def extract_products_from_html(html_content):
-    """Extract all products from HTML content."""
+def extract_products_from_html(html_content, url=None):
+    """Extract all products from HTML content fetched from `url`."""
     try:
         soup = BeautifulSoup(html_content, 'html.parser')
         cards = soup.select('div.collection-card')
         products = []
         for card in cards:
-            product = parse_product_card(card)
+            product = parse_product_card(card, url)
             if product.get('title'):  # Ensure product has at least a title
-                products.append(product)
+                products.append(Product.from_dict(product))
         return products
     except Exception as e:
         logger.error(f"Error parsing HTML content: {e}")
         return []
 
 
+def set_http_session(session):
+    """Route fetch_html through a persistent requests.Session, or back to requests.get with None."""
+    global _http_session
+    _http_session = session
+
+
 def fetch_html(url):
     """Fetch HTML content from a URL."""
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
+    headers = REQUEST_HEADERS
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        getter = requests.get if _http_session is None else _http_session.get
+        response = getter(url, headers=headers, timeout=10)
         if response.status_code == 200:
             return response.text
         logger.error(
@@ -100,22 +141,49 @@ def fetch_html(url):
     return None
 
 
-def extract_all_products(base_url, max_pages=50):
-    """Extract product data from all pages."""
-    all_products = []
+def fetch_bytes(url, timeout=10):
+    """Fetch a binary resource (e.g. a product image) through the same session as fetch_html."""
+    try:
+        getter = requests.get if _http_session is None else _http_session.get
+        response = getter(url, headers=REQUEST_HEADERS, timeout=timeout)
+        if response.status_code == 200:
+            return response.content
+        logger.warning(
+            f"Failed to fetch {url}, Status code: {response.status_code}")
+    except Exception as e:
+        logger.warning(f"Error fetching {url}: {e}")
+    return None
+
+
+def page_url(base_url, page_num):
+    """Build the URL of a catalogue page (page 1 is the base URL itself)."""
+    return base_url if page_num == 1 else f"{base_url}/page{page_num}"
+
+
+def iter_product_pages(base_url, max_pages=50, archive=None):
+    """Yield the products of each page as it is fetched, archiving pages if an archive is given."""
     for page_num in range(1, max_pages + 1):
-        url = base_url if page_num == 1 else f"{base_url}/page{page_num}"
-        logger.info(f"Fetching page {page_num}: {url}")
+        url = page_url(base_url, page_num)
+        logger.info("Fetching page %d: %s", page_num, url, extra=SAMPLED)
         time.sleep(random.uniform(1.0, 3.0))
         html = fetch_html(url)
         if html:
-            products = extract_products_from_html(html)
-            all_products.extend(products)
-            logger.info(
-                f"Extracted {len(products)} products from page {page_num}")
+            if archive is not None:
+                archive.append(url, html, page_num, 0)
+            products = extract_products_from_html(html, url)
+            logger.info("Extracted %d products from page %d",
+                        len(products), page_num, extra=SAMPLED)
+            yield products
         else:
             logger.warning(
                 f"Failed to fetch page {page_num}, stopping extraction")
             break
+
+
+def extract_all_products(base_url, max_pages=50, archive=None):
+    """Extract product data from all pages, archiving them if an archive is given."""
+    all_products = []
+    for products in iter_product_pages(base_url, max_pages, archive):
+        all_products.extend(products)
     logger.info(f"Total products extracted: {len(all_products)}")
     return all_products
@@ -9,16 +9,24 @@ from psycopg2 import extras, sql
 from oauth2client.service_account import ServiceAccountCredentials
 from googleapiclient.discovery import build
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+from utils.cdc import load_changes
+from utils.schema import setup_schema
+
 logger = logging.getLogger(__name__)
 
+SHEETS_SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
+# snapshot: append every run to fashion_products. cdc: only record changes
+# in product_price_history and keep product_current up to date.
+LOAD_MODES = ('snapshot', 'cdc')
+
 
-def save_to_csv(data: pd.DataFrame, filename: str) -> bool:
+def save_to_csv(data: pd.DataFrame, filename: str, append: bool = False) -> bool:
     try:
-        data.to_csv(filename, index=False, quoting=csv.QUOTE_NONNUMERIC)
+        if append:
+            data.to_csv(filename, mode='a', header=False, index=False,
+                        quoting=csv.QUOTE_NONNUMERIC)
+        else:
+            data.to_csv(filename, index=False, quoting=csv.QUOTE_NONNUMERIC)
         logger.info(f"Data successfully saved to CSV: {filename}")
         return True
     except Exception as e:
@@ -26,12 +34,34 @@ def save_to_csv(data: pd.DataFrame, filename: str) -> bool:
         return False
 
 
+def save_quarantine(data: pd.DataFrame, stream=None) -> bool:
+    """Write rows that failed validation, with their failed_rules, to a CSV."""
+    if stream is not None:
+        append = stream.quarantine_parts > 0
+        stream.quarantine_parts += 1
+        return save_to_csv(data, stream.quarantine_filename, append=append)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return save_to_csv(data, f"quarantine_{timestamp}.csv")
+
+
 def get_google_sheets_service(credentials_file: str, scopes: list):
     credentials = ServiceAccountCredentials.from_json_keyfile_name(
         credentials_file, scopes)
     return build('sheets', 'v4', credentials=credentials)
 
 
+def get_google_sheets_service_from_env():
+    """Build a reusable Sheets client, or None when credentials are not configured."""
+    credentials_file = os.getenv('GOOGLE_SHEET_CREDENTIALS_PATH')
+    if not credentials_file or not os.path.exists(credentials_file):
+        return None
+    try:
+        return get_google_sheets_service(credentials_file, SHEETS_SCOPES)
+    except Exception as e:
+        logger.warning(f"Could not create Google Sheets client: {e}")
+        return None
+
+
 def dataframe_to_sheets_values(df: pd.DataFrame):
     return [df.columns.tolist()] + df.values.tolist()
 
@@ -44,10 +74,10 @@ def col_letter(n: int) -> str:
     return result
 
 
-def save_to_google_sheets(data: pd.DataFrame) -> bool:
+def save_to_google_sheets(data: pd.DataFrame, service=None, start_row: int = 1) -> bool:
     SERVICE_ACCOUNT_FILE = os.getenv('GOOGLE_SHEET_CREDENTIALS_PATH')
     SPREADSHEET_ID = os.getenv('GOOGLE_SHEET_ID')
-    SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
+    SCOPES = SHEETS_SCOPES
     SHEET_NAME = 'fashion'
 
     if not SERVICE_ACCOUNT_FILE or not SPREADSHEET_ID:
@@ -66,12 +96,19 @@ def save_to_google_sheets(data: pd.DataFrame) -> bool:
         # Convert datetime objects to strings for JSON serialization
         if 'timestamp' in data_to_load.columns:
             data_to_load['timestamp'] = data_to_load['timestamp'].astype(str)
+        # Missing values (e.g. images that could not be fetched) become empty cells
+        data_to_load = data_to_load.astype(object).where(data_to_load.notna(), '')
 
-        service = get_google_sheets_service(SERVICE_ACCOUNT_FILE, SCOPES)
+        if service is None:
+            service = get_google_sheets_service(SERVICE_ACCOUNT_FILE, SCOPES)
         sheet = service.spreadsheets()
-        values = dataframe_to_sheets_values(data_to_load)
-        total_rows, total_cols = len(values), len(values[0])
-        range_name = f"{SHEET_NAME}!A1:{col_letter(total_cols)}{total_rows}"
+        # Later parts of a streamed load continue below the earlier ones, without a header
+        if start_row == 1:
+            values = dataframe_to_sheets_values(data_to_load)
+        else:
+            values = data_to_load.values.tolist()
+        total_rows, total_cols = len(values), len(data_to_load.columns)
+        range_name = f"{SHEET_NAME}!A{start_row}:{col_letter(total_cols)}{start_row + total_rows - 1}"
         body = {'values': values}
         result = sheet.values().update(
             spreadsheetId=SPREADSHEET_ID,
@@ -87,7 +124,7 @@ def save_to_google_sheets(data: pd.DataFrame) -> bool:
         return False
 
 
-def get_postgres_connection():
+def postgres_connection_params() -> dict:
     params = {
         'dbname': os.getenv('DB_NAME'),
         'user': os.getenv('DB_USER'),
@@ -100,32 +137,47 @@ def get_postgres_connection():
             "Satu atau lebih variabel koneksi database (DB_NAME, DB_USER, dll.) tidak ditemukan.")
         raise ValueError(
             "Variabel koneksi database tidak lengkap. Periksa file .env atau environment Anda.")
-    return psycopg2.connect(**params)
+    return params
+
+
+def postgres_configured() -> bool:
+    """Whether every DB_* connection variable is set."""
+    return all(os.getenv(name) for name in
+               ('DB_NAME', 'DB_USER', 'DB_HOST', 'DB_PORT', 'DB_PASSWORD'))
+
+
+def primary_sink(pool=None) -> str:
+    """The sink that decides whether rows count as loaded: PostgreSQL when configured, CSV otherwise."""
+    return 'postgresql' if pool is not None or postgres_configured() else 'csv'
+
+
+def get_postgres_connection():
+    return psycopg2.connect(**postgres_connection_params())
+
+
+def rows_for_insert(data: pd.DataFrame) -> list:
+    """Row tuples for psycopg2, with missing values (NaN, NA) sent as NULL."""
+    values = data.astype(object).where(data.notna(), None)
+    return [tuple(x) for x in values.to_numpy()]
 
 
 def create_table_if_not_exists(cursor):
-    create_table_query = '''
-    CREATE TABLE IF NOT EXISTS fashion_products (
-        id SERIAL PRIMARY KEY,
-        title VARCHAR(255) NOT NULL,
-        price NUMERIC NOT NULL,
-        rating NUMERIC,
-        colors INTEGER,
-        size VARCHAR(50),
-        gender VARCHAR(50) NOT NULL,
-        timestamp TIMESTAMP NOT NULL
-    )
-    '''
-    cursor.execute(create_table_query)
-
-
-def save_to_postgresql(data: pd.DataFrame) -> bool:
+    setup_schema(cursor)
+
+
+def save_to_postgresql(data: pd.DataFrame, pool=None) -> bool:
     try:
+        if pool is not None:
+            pool.insert_products(data)
+            logger.info(
+                "Data successfully saved to PostgreSQL table: fashion_products")
+            return True
+
         with get_postgres_connection() as conn:
             with conn.cursor() as cursor:
                 create_table_if_not_exists(cursor)
 
-                values = [tuple(x) for x in data.to_numpy()]
+                values = rows_for_insert(data)
                 columns = data.columns.tolist()
 
                 insert_query = sql.SQL("INSERT INTO fashion_products ({}) VALUES %s").format(
@@ -143,36 +195,97 @@ def save_to_postgresql(data: pd.DataFrame) -> bool:
         return False
 
 
-def load_data(data: pd.DataFrame) -> bool:
+def save_to_postgresql_cdc(data: pd.DataFrame, pool=None, report=None) -> bool:
+    try:
+        if pool is not None:
+            with pool.connection() as conn:
+                with conn.cursor() as cursor:
+                    counts = load_changes(cursor, data)
+        else:
+            with get_postgres_connection() as conn:
+                with conn.cursor() as cursor:
+                    create_table_if_not_exists(cursor)
+                    counts = load_changes(cursor, data)
+
+        if report is not None:
+            totals = report.setdefault('cdc', dict.fromkeys(counts, 0))
+            for key, count in counts.items():
+                totals[key] += count
+        logger.info(
+            "Data successfully saved to PostgreSQL tables: product_current, product_price_history")
+        return True
+    except (psycopg2.Error, Exception) as e:
+        logger.error(f"Database connection or operation error: {e}")
+        return False
+
+
+class LoadStream:
+    """
+    Sink positions for a run loaded in several parts (see utils.spill).
+
+    The first part creates the CSV and writes the sheet from A1 with a
+    header; later parts append to the same CSV and continue below in the
+    sheet. Quarantined rows of all parts go to one quarantine CSV.
+    """
+
+    def __init__(self):
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.csv_filename = f"products_{timestamp}.csv"
+        self.quarantine_filename = f"quarantine_{timestamp}.csv"
+        self.sheet_row = 1
+        self.parts = 0
+        self.quarantine_parts = 0
+
+
+def load_data(data: pd.DataFrame, pool=None, sheets_service=None,
+              stream: LoadStream = None, load_mode: str = 'snapshot',
+              report=None, sinks: dict = None) -> bool:
+    """
+    Save `data` to CSV, Google Sheets and PostgreSQL. Returns True only if
+    every sink succeeded; pass a `sinks` dict to get each sink's outcome.
+    """
     if data.empty:
         logger.warning("No data to load")
         return False
 
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    success = True
+    filename = stream.csv_filename if stream else f"products_{timestamp}.csv"
+    append = stream is not None and stream.parts > 0
+    start_row = stream.sheet_row if stream else 1
+    results = {}
 
     try:
-        if not save_to_csv(data, f"products_{timestamp}.csv"):
+        results['csv'] = bool(save_to_csv(data, filename, append=append))
+        if not results['csv']:
             logger.warning("Failed to save data to CSV")
-            success = False
     except Exception as e:
         logger.error(f"Unhandled exception during CSV save: {e}")
-        success = False
+        results['csv'] = False
 
     try:
-        if not save_to_google_sheets(data):
+        results['google_sheets'] = bool(save_to_google_sheets(
+            data, service=sheets_service, start_row=start_row))
+        if not results['google_sheets']:
             logger.warning("Failed to save data to Google Sheets")
-            success = False
     except Exception as e:
         logger.error(f"Unhandled exception during Google Sheets save: {e}")
-        success = False
+        results['google_sheets'] = False
 
     try:
-        if not save_to_postgresql(data):
+        if load_mode == 'cdc':
+            saved = save_to_postgresql_cdc(data, pool=pool, report=report)
+        else:
+            saved = save_to_postgresql(data, pool=pool)
+        results['postgresql'] = bool(saved)
+        if not saved:
             logger.warning("Failed to save data to PostgreSQL")
-            success = False
     except Exception as e:
         logger.error(f"Unhandled exception during PostgreSQL save: {e}")
-        success = False
-
-    return success
+        results['postgresql'] = False
+
+    if stream is not None:
+        stream.parts += 1
+        stream.sheet_row += len(data) + (1 if start_row == 1 else 0)
+    if sinks is not None:
+        sinks.update(results)
+    return all(results.values())
@@ -0,0 +1,145 @@
+import atexit
+import json
+import logging
+import queue
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+LOG_FORMATS = ('text', 'json')
+DEFAULT_SAMPLE_EVERY = 10
+
+# Extra for per-page events, e.g. logger.info("Fetching page %d", n, extra=SAMPLED).
+# With sampling on, only the first and every n-th of each such message is written.
+SAMPLED = {'sampled': True}
+
+# Runs happen one at a time and crawl threads should share the run's IDs, so
+# this is module state rather than a contextvar (new threads start without one).
+_context = {'run_id': None, 'stage': None}
+_listener = None
+_queue_handler = None
+_saved_flags = None
+_FLAGS = ('_srcfile', 'logThreads', 'logProcesses', 'logMultiprocessing')
+
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {
+    'message', 'asctime', 'run_id', 'stage', 'sampled', 'taskName'}
+
+
+def set_run_id(run_id):
+    _context['run_id'] = run_id
+
+
+def set_stage(stage):
+    _context['stage'] = stage
+
+
+class ContextFilter(logging.Filter):
+    """Stamps each record with the current run and stage IDs."""
+
+    def filter(self, record):
+        record.run_id = _context['run_id']
+        record.stage = _context['stage']
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps the first and then every `every`-th record of each message marked
+    SAMPLED. Records at WARNING and above are never dropped.
+    """
+
+    def __init__(self, every=DEFAULT_SAMPLE_EVERY):
+        super().__init__()
+        self.every = every
+        self._counts = {}
+
+    def filter(self, record):
+        if self.every <= 1 or record.levelno >= logging.WARNING \
+                or not getattr(record, 'sampled', False):
+            return True
+        # The unformatted template is the key, so every page shares one counter.
+        key = (record.name, record.msg)
+        count = self._counts.get(key, 0)
+        self._counts[key] = count + 1
+        return count % self.every == 0
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the run and stage IDs and any `extra` fields."""
+
+    def format(self, record):
+        event = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc)
+            .isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'run_id': getattr(record, 'run_id', None),
+            'stage': getattr(record, 'stage', None),
+            'message': record.getMessage(),
+        }
+        event.update((key, value) for key, value in vars(record).items()
+                     if key not in _RECORD_ATTRIBUTES)
+        if record.exc_info:
+            event['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(event, default=str)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    # The stock prepare() formats the message in the logging thread; the
+    # queue never leaves the process, so leave that to the listener.
+    def prepare(self, record):
+        return record
+
+
+def setup_logging(level=logging.INFO, log_format='text',
+                  sample_every=DEFAULT_SAMPLE_EVERY, stream=None):
+    """
+    Configure logging for the whole process, replacing any earlier setup.
+
+    Loggers only put records on an in-memory queue; a background
+    QueueListener thread formats and writes them, so log I/O stays off the
+    crawl and transform threads.
+    """
+    global _listener, _queue_handler, _saved_flags
+    shutdown_logging()
+    root = logging.getLogger()
+    root.setLevel(level)
+    # Neither format shows the caller's file/line, thread or process, so skip
+    # collecting them for every record (see "Optimization" in the logging HOWTO).
+    # shutdown_logging puts them back.
+    _saved_flags = {flag: getattr(logging, flag) for flag in _FLAGS}
+    logging._srcfile = None
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonFormatter() if log_format == 'json'
+                         else logging.Formatter(TEXT_FORMAT))
+    log_queue = queue.SimpleQueue()
+    _queue_handler = _DeferredQueueHandler(log_queue)
+    _queue_handler.addFilter(SamplingFilter(sample_every))
+    _queue_handler.addFilter(ContextFilter())
+
+    root.addHandler(_queue_handler)
+    _listener = QueueListener(log_queue, handler)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    """Flush queued records, detach the background writer and restore the logging flags."""
+    global _listener, _queue_handler, _saved_flags
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _saved_flags is not None:
+        for flag, value in _saved_flags.items():
+            setattr(logging, flag, value)
+        _saved_flags = None
+
+
+atexit.register(shutdown_logging)
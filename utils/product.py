@@ -0,0 +1,88 @@
+import sys
+from collections.abc import Mapping
+
+import pandas as pd
+
+PRODUCT_FIELDS = ('image_url', 'product_alt', 'title', 'price',
+                  'rating', 'colors', 'size', 'gender')
+
+_SAME_AS_TITLE = object()
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Product(Mapping):
+    """
+    Compact, read-only product record produced by the extract stage.
+
+    Behaves like the dict returned by `parse_product_card` (``product['title']``,
+    ``product.get('size')``) but keeps its fields in slots instead of a
+    per-product dict. Low-cardinality values (size, gender and the image URL
+    prefix) are interned so millions of products share the same string
+    objects, and an alt text equal to the title reuses the title string.
+    """
+
+    __slots__ = ('_image_prefix', '_image_name', '_product_alt', 'title',
+                 'price', 'rating', 'colors', 'size', 'gender')
+
+    def __init__(self, image_url=None, product_alt=None, title=None, price=None,
+                 rating=None, colors=None, size=None, gender=None):
+        if isinstance(image_url, str):
+            prefix, sep, name = image_url.rpartition('/')
+            self._image_prefix = sys.intern(prefix + sep)
+            self._image_name = name
+        else:
+            self._image_prefix = None
+            self._image_name = image_url
+        self.title = title
+        if product_alt is not None and product_alt == title:
+            product_alt = _SAME_AS_TITLE
+        self._product_alt = product_alt
+        self.price = price
+        self.rating = rating
+        self.colors = colors
+        self.size = _intern(size)
+        self.gender = _intern(gender)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{field: data.get(field) for field in PRODUCT_FIELDS})
+
+    @property
+    def image_url(self):
+        if self._image_prefix is None:
+            return self._image_name
+        return self._image_prefix + self._image_name
+
+    @property
+    def product_alt(self):
+        if self._product_alt is _SAME_AS_TITLE:
+            return self.title
+        return self._product_alt
+
+    def __getitem__(self, key):
+        if key not in PRODUCT_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(PRODUCT_FIELDS)
+
+    def __len__(self):
+        return len(PRODUCT_FIELDS)
+
+    def __repr__(self):
+        return f"Product(title={self.title!r}, price={self.price!r}, size={self.size!r})"
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in PRODUCT_FIELDS}
+
+
+def products_to_frame(products) -> pd.DataFrame:
+    """Build the raw DataFrame consumed by `transform_data`, column by column."""
+    return pd.DataFrame({
+        field: [getattr(product, field) for product in products]
+        for field in PRODUCT_FIELDS
+    })
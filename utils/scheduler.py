@@ -0,0 +1,167 @@
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+from utils.extract import fetch_html, extract_products_from_html, page_url
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGES = 50
+DEFAULT_BUDGET = {'concurrency': 1, 'min_delay': 1.0, 'max_delay': 3.0}
+
+_DONE = object()
+
+
+class HostBudget:
+    """Concurrency and request-spacing budget shared by all workers of a host."""
+
+    def __init__(self, concurrency=1, min_delay=1.0, max_delay=3.0):
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        if min_delay < 0 or max_delay < min_delay:
+            raise ValueError("expected 0 <= min_delay <= max_delay")
+        self.concurrency = int(concurrency)
+        self.min_delay = float(min_delay)
+        self.max_delay = float(max_delay)
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        """Block until the host's rate budget allows another request."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + \
+                random.uniform(self.min_delay, self.max_delay)
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def host_of(url):
+    return urlparse(url).netloc
+
+
+def build_sources(urls, max_pages=DEFAULT_PAGES):
+    """Normalize seed URLs (strings or {'url', 'pages'} dicts) into sources."""
+    sources = []
+    for seed in urls:
+        if isinstance(seed, str):
+            seed = {'url': seed}
+        if not seed.get('url'):
+            raise ValueError(f"Crawl source without url: {seed}")
+        sources.append({
+            'url': seed['url'].rstrip('/'),
+            'pages': int(seed.get('pages', max_pages)),
+        })
+    return sources
+
+
+def load_crawl_config(path):
+    """
+    Load crawl sources and per-host budgets from a JSON config file.
+
+    Expected layout::
+
+        {
+          "defaults": {"pages": 50, "concurrency": 1,
+                       "min_delay": 1.0, "max_delay": 3.0},
+          "hosts": {"example.com": {"concurrency": 2, "min_delay": 0.5}},
+          "sources": ["https://example.com",
+                      {"url": "https://other.example/shoes", "pages": 10}]
+        }
+    """
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+
+    defaults = dict(DEFAULT_BUDGET, pages=DEFAULT_PAGES)
+    defaults.update(config.get('defaults', {}))
+    sources = build_sources(config.get('sources', []), defaults['pages'])
+
+    host_settings = config.get('hosts', {})
+    budgets = {}
+    for host in {host_of(source['url']) for source in sources} | set(host_settings):
+        settings = {key: defaults[key] for key in DEFAULT_BUDGET}
+        settings.update(host_settings.get(host, {}))
+        budgets[host] = HostBudget(**settings)
+    return sources, budgets
+
+
+def _crawl_source(index, source, budget, results, archive=None):
+    for page_num in range(1, source['pages'] + 1):
+        url = page_url(source['url'], page_num)
+        budget.wait()
+        html = fetch_html(url)
+        if not html:
+            logger.warning(
+                f"Failed to fetch page {page_num} of {source['url']}, stopping this source")
+            break
+        if archive is not None:
+            archive.append(url, html, page_num, index)
+        products = extract_products_from_html(html, url)
+        results.put((index, page_num, products))
+
+
+def _host_worker(host, work, budget, results, archive):
+    try:
+        while True:
+            try:
+                index, source = work.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                _crawl_source(index, source, budget, results, archive)
+            except Exception as e:
+                logger.error(f"Error crawling {source['url']} on {host}: {e}")
+    finally:
+        results.put(_DONE)
+
+
+def iter_crawl_pages(sources, host_budgets=None, archive=None):
+    """
+    Crawl all sources concurrently and yield (source_index, page_num, products)
+    as pages complete.
+
+    Each host gets its own worker threads (its budget's concurrency), so a slow
+    host only delays its own sources while the others keep going.
+    """
+    host_budgets = host_budgets or {}
+    by_host = {}
+    for index, source in enumerate(sources):
+        by_host.setdefault(host_of(source['url']), []).append((index, source))
+
+    results = queue.Queue()
+    workers = 0
+    for host, host_sources in by_host.items():
+        budget = host_budgets.get(host)
+        if budget is None:
+            budget = host_budgets[host] = HostBudget(**DEFAULT_BUDGET)
+        work = queue.Queue()
+        for item in host_sources:
+            work.put(item)
+        for _ in range(min(budget.concurrency, len(host_sources))):
+            threading.Thread(
+                target=_host_worker, args=(host, work, budget, results, archive),
+                name=f"crawl-{host}", daemon=True).start()
+            workers += 1
+
+    while workers:
+        item = results.get()
+        if item is _DONE:
+            workers -= 1
+            continue
+        yield item
+
+
+def crawl_sources(sources, host_budgets=None, archive=None):
+    """Crawl all sources and return their products in source and page order."""
+    pages = sorted(iter_crawl_pages(sources, host_budgets, archive),
+                   key=lambda item: item[:2])
+    all_products = [product for _, _, products in pages
+                    for product in products]
+    logger.info(
+        f"Total products extracted from {len(sources)} sources: {len(all_products)}")
+    return all_products
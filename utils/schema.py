@@ -0,0 +1,268 @@
+import logging
+import os
+import re
+from datetime import date, datetime
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'fashion_products'
+# Tables of the CDC load mode (utils.cdc).
+CURRENT_TABLE = 'product_current'
+HISTORY_TABLE = 'product_price_history'
+PARTITION_PATTERN = re.compile(rf'^{TABLE}_p(\d{{4}})(\d{{2}})$')
+# Arbitrary key so concurrent loaders never migrate the same database at once.
+MIGRATION_LOCK_ID = 72150331
+
+CREATE_MIGRATIONS_TABLE = '''
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    description VARCHAR(255) NOT NULL,
+    applied_at TIMESTAMP NOT NULL DEFAULT now()
+)
+'''
+
+PARTITIONING_VERSION = 3
+
+BASE_COLUMNS = ['id', 'title', 'price', 'rating', 'colors', 'size', 'gender', 'timestamp']
+# Filled by the optional image enrichment stage (utils.enrich), NULL otherwise.
+IMAGE_COLUMNS = {
+    'image_url': 'TEXT',
+    'image_bytes': 'INTEGER',
+    'image_width': 'INTEGER',
+    'image_height': 'INTEGER',
+    'image_dhash': 'CHAR(16)',
+}
+IMAGE_COLUMN_DEFINITIONS = ', '.join(
+    f"{name} {sql_type}" for name, sql_type in IMAGE_COLUMNS.items())
+
+
+def month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{TABLE}_p{month.year:04d}{month.month:02d}"
+
+
+def ensure_monthly_partitions(cursor, start, end):
+    """Create the monthly partitions covering start..end (inclusive)."""
+    month = month_start(start)
+    last = month_start(end)
+    created = []
+    while month <= last:
+        name = partition_name(month)
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {TABLE} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')")
+        created.append(name)
+        month = add_months(month, 1)
+    return created
+
+
+def ensure_current_partitions(cursor):
+    """Create the partitions for this and next month."""
+    today = date.today()
+    return ensure_monthly_partitions(cursor, today, add_months(month_start(today), 1))
+
+
+def _partition_by_month(cursor):
+    """Rebuild fashion_products as a table range-partitioned by month on timestamp."""
+    cursor.execute(f"SELECT min(timestamp), max(timestamp) FROM {TABLE}")
+    first, last = cursor.fetchone()
+    now = datetime.now()
+
+    for statement in (
+        f"DROP INDEX IF EXISTS {TABLE}_timestamp_brin, {TABLE}_natural_key_idx, {TABLE}_gender_idx",
+        f"ALTER TABLE {TABLE} RENAME TO {TABLE}_unpartitioned",
+        f"ALTER TABLE {TABLE}_unpartitioned RENAME CONSTRAINT {TABLE}_pkey TO {TABLE}_unpartitioned_pkey",
+        f'''
+        CREATE TABLE {TABLE} (
+            id INTEGER NOT NULL DEFAULT nextval('{TABLE}_id_seq'),
+            title VARCHAR(255) NOT NULL,
+            price NUMERIC NOT NULL,
+            rating NUMERIC,
+            colors INTEGER,
+            size VARCHAR(50),
+            gender VARCHAR(50) NOT NULL,
+            timestamp TIMESTAMP NOT NULL,
+            {IMAGE_COLUMN_DEFINITIONS},
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+        ''',
+        f"ALTER SEQUENCE {TABLE}_id_seq OWNED BY {TABLE}.id",
+        f"CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT",
+    ):
+        cursor.execute(statement)
+    _create_indexes(cursor)
+
+    ensure_monthly_partitions(cursor, min(first or now, now), max(last or now, now))
+    # The image columns exist on the old table only if migration 4 ran first.
+    cursor.execute(
+        "SELECT column_name FROM information_schema.columns WHERE table_name = %s",
+        (f"{TABLE}_unpartitioned",))
+    existing = {row[0] for row in cursor.fetchall()}
+    columns = ', '.join(BASE_COLUMNS + [name for name in IMAGE_COLUMNS if name in existing])
+    cursor.execute(
+        f"INSERT INTO {TABLE} ({columns}) SELECT {columns} FROM {TABLE}_unpartitioned")
+    cursor.execute(f"DROP TABLE {TABLE}_unpartitioned")
+
+
+def _add_image_columns(cursor):
+    cursor.execute(f"ALTER TABLE {TABLE} " + ', '.join(
+        f"ADD COLUMN IF NOT EXISTS {name} {sql_type}"
+        for name, sql_type in IMAGE_COLUMNS.items()))
+
+
+def _create_indexes(cursor):
+    for statement in (
+        f"CREATE INDEX IF NOT EXISTS {TABLE}_timestamp_brin ON {TABLE} USING BRIN (timestamp)",
+        f"CREATE INDEX IF NOT EXISTS {TABLE}_natural_key_idx ON {TABLE} (title, size, gender)",
+        f"CREATE INDEX IF NOT EXISTS {TABLE}_gender_idx ON {TABLE} (gender)",
+    ):
+        cursor.execute(statement)
+
+
+# (version, description, steps). A step is either a SQL string or a callable
+# taking the cursor. Applied versions are recorded in schema_migrations.
+MIGRATIONS = [
+    (1, 'create fashion_products', [f'''
+    CREATE TABLE IF NOT EXISTS {TABLE} (
+        id SERIAL PRIMARY KEY,
+        title VARCHAR(255) NOT NULL,
+        price NUMERIC NOT NULL,
+        rating NUMERIC,
+        colors INTEGER,
+        size VARCHAR(50),
+        gender VARCHAR(50) NOT NULL,
+        timestamp TIMESTAMP NOT NULL
+    )
+    ''']),
+    (2, 'index timestamp (BRIN), natural key and gender', [_create_indexes]),
+    (PARTITIONING_VERSION, 'monthly range partitioning on timestamp',
+     [_partition_by_month]),
+    (4, 'nullable image metadata columns', [_add_image_columns]),
+    (5, 'product_current and product_price_history for the CDC load mode', [f'''
+    CREATE TABLE IF NOT EXISTS {CURRENT_TABLE} (
+        title VARCHAR(255) NOT NULL,
+        size VARCHAR(50) NOT NULL,
+        gender VARCHAR(50) NOT NULL,
+        price NUMERIC NOT NULL,
+        rating NUMERIC,
+        colors INTEGER,
+        valid_from TIMESTAMP NOT NULL,
+        PRIMARY KEY (title, size, gender)
+    )
+    ''', f'''
+    CREATE TABLE IF NOT EXISTS {HISTORY_TABLE} (
+        id BIGSERIAL PRIMARY KEY,
+        title VARCHAR(255) NOT NULL,
+        size VARCHAR(50) NOT NULL,
+        gender VARCHAR(50) NOT NULL,
+        price NUMERIC NOT NULL,
+        rating NUMERIC,
+        colors INTEGER,
+        valid_from TIMESTAMP NOT NULL,
+        valid_to TIMESTAMP
+    )
+    ''',
+        f"CREATE INDEX IF NOT EXISTS {HISTORY_TABLE}_key_idx "
+        f"ON {HISTORY_TABLE} (title, size, gender, valid_from)",
+        f"CREATE UNIQUE INDEX IF NOT EXISTS {HISTORY_TABLE}_open_idx "
+        f"ON {HISTORY_TABLE} (title, size, gender) WHERE valid_to IS NULL",
+    ]),
+]
+
+# Only applied when partitioning is enabled.
+OPTIONAL_MIGRATIONS = {PARTITIONING_VERSION}
+
+
+def partitioning_enabled() -> bool:
+    return os.getenv('DB_PARTITIONING', '').strip().lower() == 'monthly'
+
+
+def applied_versions(cursor) -> set:
+    cursor.execute(CREATE_MIGRATIONS_TABLE)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def apply_migrations(cursor, partitioned=None) -> set:
+    """
+    Apply pending migrations in version order and return the applied versions.
+
+    Optional migrations (partitioning) only run when `partitioned` is true,
+    which defaults to the DB_PARTITIONING environment variable.
+    """
+    if partitioned is None:
+        partitioned = partitioning_enabled()
+    cursor.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK_ID,))
+    applied = applied_versions(cursor)
+
+    for version, description, steps in MIGRATIONS:
+        if version in applied:
+            continue
+        if version in OPTIONAL_MIGRATIONS and not partitioned:
+            continue
+        logger.info(f"Applying schema migration {version}: {description}")
+        for step in steps:
+            if callable(step):
+                step(cursor)
+            else:
+                cursor.execute(step)
+        cursor.execute(
+            "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+            (version, description))
+        applied.add(version)
+    return applied
+
+
+def setup_schema(cursor, partitioned=None) -> set:
+    """Migrate the schema and, if partitioned, make sure this and next month have partitions."""
+    applied = apply_migrations(cursor, partitioned)
+    if PARTITIONING_VERSION in applied:
+        ensure_current_partitions(cursor)
+    return applied
+
+
+def list_partitions(cursor) -> list:
+    cursor.execute('''
+    SELECT child.relname
+    FROM pg_inherits
+    JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+    JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+    WHERE parent.relname = %s
+    ''', (TABLE,))
+    return sorted(row[0] for row in cursor.fetchall())
+
+
+def drop_partitions_older_than(cursor, cutoff) -> list:
+    """
+    Detach and drop monthly partitions whose whole range is before `cutoff`.
+
+    Dropping a partition is a metadata operation, unlike DELETE which has to
+    scan and vacuum every expired row.
+    """
+    cutoff = month_start(cutoff)
+    dropped = []
+    for name in list_partitions(cursor):
+        match = PARTITION_PATTERN.match(name)
+        if not match:
+            continue
+        month = date(int(match.group(1)), int(match.group(2)), 1)
+        if add_months(month, 1) <= cutoff:
+            cursor.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {name}")
+            cursor.execute(f"DROP TABLE {name}")
+            dropped.append(name)
+    if dropped:
+        logger.info(f"Dropped {len(dropped)} expired partitions: {', '.join(dropped)}")
+    return dropped
+
+
+def retention_cutoff(months: int, today=None) -> date:
+    """First day of the oldest month kept when retaining `months` months."""
+    return add_months(month_start(today or date.today()), -(months - 1))
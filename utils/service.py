@@ -0,0 +1,137 @@
+import json
+import logging
+import random
+import re
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+DURATION_PATTERN = re.compile(r'(\d+(?:\.\d+)?)([hms])')
+DURATION_UNITS = {'h': 3600, 'm': 60, 's': 1}
+
+
+def parse_duration(text) -> float:
+    """Parse '1h', '30m', '1h30m', '45s' or plain seconds into seconds."""
+    text = str(text).strip().lower()
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    parts = DURATION_PATTERN.findall(text)
+    if not parts or ''.join(value + unit for value, unit in parts) != text:
+        raise ValueError(f"Invalid duration: {text!r}")
+    return sum(float(value) * DURATION_UNITS[unit] for value, unit in parts)
+
+
+class RunState:
+    """Timings and outcome of the daemon's runs, shared with the health endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self.runs = 0
+        self.failures = 0
+        self.running = False
+        self.last_run = None
+        self.next_run_at = None
+
+    def run_started(self):
+        with self._lock:
+            self.running = True
+
+    def run_finished(self, started_at, duration, success, report):
+        with self._lock:
+            self.running = False
+            self.runs += 1
+            if not success:
+                self.failures += 1
+            self.last_run = {
+                'started_at': started_at,
+                'duration_seconds': round(duration, 3),
+                'success': success,
+                'report': report,
+            }
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'started_at': self.started_at,
+                'runs': self.runs,
+                'failures': self.failures,
+                'running': self.running,
+                'last_run': self.last_run,
+                'next_run_at': self.next_run_at,
+            }
+
+
+def _handler_for(state):
+    class HealthHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            snapshot = state.snapshot()
+            if self.path == '/health':
+                last_run = snapshot['last_run']
+                healthy = last_run is None or last_run['success']
+                body = {'status': 'ok' if healthy else 'failing',
+                        'running': snapshot['running']}
+                status = 200 if healthy else 503
+            elif self.path == '/metrics':
+                body, status = snapshot, 200
+            else:
+                body, status = {'error': 'not found'}, 404
+            payload = json.dumps(body, default=str).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            logger.debug("Health endpoint: " + format % args)
+
+    return HealthHandler
+
+
+def start_health_server(state, port, host='127.0.0.1'):
+    """Serve /health and /metrics (JSON) from a background thread."""
+    server = ThreadingHTTPServer((host, port), _handler_for(state))
+    threading.Thread(target=server.serve_forever, name='health-server',
+                     daemon=True).start()
+    logger.info(f"Health endpoint listening on http://{host}:{server.server_port}")
+    return server
+
+
+def serve(run_once, interval, jitter=0.0, state=None, stop_event=None,
+          max_runs=None):
+    """
+    Call `run_once(report)` every `interval` seconds until `stop_event` is set.
+
+    Runs happen one after another on this thread, so they never overlap: a
+    run that takes longer than the interval just delays the next one. Each
+    wait adds a random 0..`jitter` seconds.
+    """
+    state = state or RunState()
+    stop_event = stop_event or threading.Event()
+    while not stop_event.is_set():
+        started = time.monotonic()
+        started_at = datetime.now().isoformat(timespec='seconds')
+        report = {}
+        state.run_started()
+        try:
+            success = bool(run_once(report))
+        except Exception as e:
+            logger.error(f"Scheduled run failed: {e}")
+            success = False
+        duration = time.monotonic() - started
+        state.run_finished(started_at, duration, success, report)
+
+        if max_runs is not None and state.runs >= max_runs:
+            break
+        delay = max(0.0, interval - duration) + random.uniform(0, jitter)
+        state.next_run_at = datetime.fromtimestamp(
+            time.time() + delay).isoformat(timespec='seconds')
+        logger.info(f"Next run in {delay:.0f}s")
+        stop_event.wait(delay)
+    return state
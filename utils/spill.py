@@ -0,0 +1,165 @@
+import glob
+import logging
+import os
+import re
+import shutil
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from utils.dedup import row_hashes
+from utils.transform import DEDUP_SUBSET, clean_frame, raw_frame
+
+logger = logging.getLogger(__name__)
+
+SIZE_PATTERN = re.compile(r'^(\d+(?:\.\d+)?)\s*([kmgt]?)i?b?$')
+SIZE_UNITS = {'': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3, 't': 1024 ** 4}
+
+# Starting guess for the in-memory size of one cleaned row, replaced by the
+# measured size once the first batch has been cleaned.
+INITIAL_BYTES_PER_ROW = 1024
+# How many times an oversized bucket may be re-split on further hash digits.
+MAX_SPLIT_LEVELS = 4
+
+
+def parse_size(text) -> int:
+    """Parse '512M', '2G', '1.5GiB' or plain bytes into a byte count."""
+    match = SIZE_PATTERN.match(str(text).strip().lower())
+    if not match:
+        raise ValueError(f"Invalid size: {text!r}")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2)])
+
+
+class OutOfCoreTransform:
+    """
+    transform_data for crawls that do not fit in memory.
+
+    Extracted products are buffered up to a quarter of the memory limit, then
+    cleaned (everything transform_data does except deduplication) and spilled
+    to Parquet files, split into hash buckets on the dedup key. Identical
+    products therefore always land in the same bucket, so deduplicating each
+    bucket on its own is a global dedup. `partitions()` reads groups of
+    buckets sized to fit in half the memory limit and yields them cleaned
+    and deduplicated, ready to stream into the sinks.
+    """
+
+    def __init__(self, memory_limit: int, workdir: str = None, num_buckets: int = 64,
+                 keep_image_url: bool = False, fill: bool = True,
+                 timestamp: str = None):
+        self.memory_limit = memory_limit
+        self.num_buckets = num_buckets
+        self.keep_image_url = keep_image_url
+        self.fill = fill
+        self.workdir = tempfile.mkdtemp(prefix='etl-spill-', dir=workdir)
+        self.timestamp = timestamp or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.bucket_rows = [0] * num_buckets
+        self.bytes_per_row = INITIAL_BYTES_PER_ROW
+        self.rows_extracted = 0
+        self.rows_spilled = 0
+        self._buffer = []
+        self._batches = 0
+
+    @property
+    def batch_rows(self) -> int:
+        return max(1, int(self.memory_limit / 4 / self.bytes_per_row))
+
+    def add(self, products):
+        self._buffer.extend(products)
+        self.rows_extracted += len(products)
+        if len(self._buffer) >= self.batch_rows:
+            self.flush()
+
+    @property
+    def max_partition_rows(self) -> int:
+        return max(1, int(self.memory_limit / 2 / self.bytes_per_row))
+
+    def _write_buckets(self, frame, keys, directory, name, bucket_rows):
+        for bucket, part in frame.groupby(keys):
+            bucket = int(bucket)
+            bucket_dir = os.path.join(directory, f"bucket-{bucket:04d}")
+            os.makedirs(bucket_dir, exist_ok=True)
+            part.to_parquet(os.path.join(bucket_dir, f"{name}.parquet"), index=False)
+            bucket_rows[bucket] += len(part)
+
+    def _bucket_keys(self, frame, level) -> np.ndarray:
+        # Level 1 uses the lowest base-`num_buckets` digit of the hash, deeper
+        # levels the next digits, so re-splitting keeps duplicates together.
+        divisor = np.uint64(self.num_buckets ** (level - 1))
+        return (row_hashes(frame, DEDUP_SUBSET) // divisor) % np.uint64(self.num_buckets)
+
+    def flush(self):
+        if not self._buffer:
+            return
+        raw, self._buffer = self._buffer, []
+        cleaned = clean_frame(raw_frame(raw), self.timestamp, self.keep_image_url,
+                              self.fill)
+        del raw
+        if cleaned.empty:
+            return
+
+        measured = cleaned.memory_usage(deep=True).sum() / len(cleaned)
+        self.bytes_per_row = max(self.bytes_per_row if self._batches else 0, measured)
+        self._write_buckets(cleaned, self._bucket_keys(cleaned, 1), self.workdir,
+                            f"batch-{self._batches:06d}", self.bucket_rows)
+        self.rows_spilled += len(cleaned)
+        self._batches += 1
+        logger.debug("Spilled batch %d (%d rows)", self._batches, len(cleaned))
+
+    @staticmethod
+    def _bucket_files(directory, bucket) -> list:
+        return sorted(glob.glob(
+            os.path.join(directory, f"bucket-{bucket:04d}", '*.parquet')))
+
+    @staticmethod
+    def _read(paths) -> pd.DataFrame:
+        frame = pd.concat([pd.read_parquet(path) for path in paths],
+                          ignore_index=True)
+        return frame.drop_duplicates(subset=DEDUP_SUBSET)
+
+    def _split(self, paths, directory, level):
+        """Re-spill an oversized bucket on the next hash digit, one file at a time."""
+        bucket_rows = [0] * self.num_buckets
+        for index, path in enumerate(paths):
+            part = pd.read_parquet(path)
+            self._write_buckets(part, self._bucket_keys(part, level + 1), directory,
+                                f"split-{index:06d}", bucket_rows)
+        yield from self._partitions(directory, bucket_rows, level + 1)
+
+    def _partitions(self, directory, bucket_rows, level):
+        max_rows = self.max_partition_rows
+        group, group_rows = [], 0
+        for bucket, rows in enumerate(bucket_rows):
+            if not rows:
+                continue
+            paths = self._bucket_files(directory, bucket)
+            if rows > max_rows:
+                if level < MAX_SPLIT_LEVELS:
+                    split_dir = os.path.join(directory, f"bucket-{bucket:04d}", 'split')
+                    yield from self._split(paths, split_dir, level)
+                    continue
+                logger.warning(
+                    f"{rows} rows share one dedup bucket, more than the memory "
+                    f"limit allows ({max_rows}); processing them together")
+            if group and group_rows + rows > max_rows:
+                yield self._read(group)
+                group, group_rows = [], 0
+            group += paths
+            group_rows += rows
+        if group:
+            yield self._read(group)
+
+    def partitions(self):
+        """Yield deduplicated partitions that each fit within the memory limit."""
+        self.flush()
+        yield from self._partitions(self.workdir, self.bucket_rows, 1)
+
+    def close(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,57 +1,126 @@
+import numpy as np
 import pandas as pd
 import logging
 from datetime import datetime
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+from utils.extract import COLORS_PATTERN, PRICE_PATTERN, RATING_PATTERN
+from utils.product import Product, products_to_frame
+
 logger = logging.getLogger(__name__)
 
 
-def transform_data(raw_data):
+def _parse_column(values: pd.Series, pattern, postprocess=None) -> pd.Series:
     """
-    Transform the raw product data into a cleaned and structured DataFrame.
+    Parse a column that may hold numbers, numeric strings or raw detail text.
+
+    Repeated values are parsed once: the column is factorized, the distinct
+    values go through `pd.to_numeric` and, for those still unparsed, one
+    vectorized `str.extract` with the precompiled pattern, and the results
+    are mapped back by code.
     """
-    logger.info("Starting data transformation")
+    codes, uniques = pd.factorize(values)
+    uniques = pd.Series(uniques, dtype=object)
+    parsed = pd.to_numeric(uniques, errors='coerce').astype(float)
+    raw = parsed.isna()
+    if raw.any():
+        extracted = uniques[raw].astype(str).str.extract(pattern, expand=False)
+        if postprocess is not None:
+            extracted = postprocess(extracted)
+        parsed[raw] = pd.to_numeric(extracted, errors='coerce')
+    # Code -1 (missing value) picks the trailing NaN.
+    lookup = np.append(parsed.to_numpy(dtype=float), np.nan)
+    return pd.Series(lookup[codes], index=values.index)
 
-    expected_columns = ['title', 'price', 'rating',
-                        'colors', 'size', 'gender', 'timestamp']
 
-    if not raw_data or len(raw_data) == 0:
-        logger.warning("No data to transform")
-        return pd.DataFrame(columns=expected_columns)
+def parse_price_column(values: pd.Series) -> pd.Series:
+    return _parse_column(values, PRICE_PATTERN,
+                         lambda prices: prices.str.replace(',', '', regex=False))
+
+
+def parse_rating_column(values: pd.Series) -> pd.Series:
+    return _parse_column(values, RATING_PATTERN)
+
+
+def parse_colors_column(values: pd.Series) -> pd.Series:
+    return _parse_column(values, COLORS_PATTERN)
+
+
+EXPECTED_COLUMNS = ['title', 'price', 'rating',
+                    'colors', 'size', 'gender', 'timestamp']
+DEDUP_SUBSET = ['title', 'price', 'size', 'gender']
+
+
+def raw_frame(raw_data):
+    """Build a DataFrame from extracted Products or product dicts."""
+    if isinstance(raw_data[0], Product):
+        return products_to_frame(raw_data)
+    return pd.DataFrame(raw_data)
+
 
-    try:
-        df = pd.DataFrame(raw_data)
+def fill_missing(df):
+    """
+    Fill values the page did not provide: price 0, rating 0.0, 1 color and
+    'One Size'.
+    """
+    df = df.copy()
+    df['price'] = df['price'].fillna(0)
+    df['rating'] = df['rating'].fillna(0.0)
+    df['colors'] = df['colors'].fillna(1).astype(int)
+    df['size'] = df['size'].fillna('One Size')
+    return df
+
+
+def clean_frame(df, timestamp=None, keep_image_url=False, fill=True):
+    """
+    Clean a raw product frame, without deduplication.
+
+    Split out of transform_data so batches can be cleaned independently and
+    deduplicated later (see utils.spill). With `keep_image_url` the frame
+    also keeps `image_url` for the image enrichment stage. With `fill=False`
+    missing or unparseable values stay NaN so validation can see them; call
+    fill_missing afterwards.
+    """
+    # Ensure all expected columns exist right after creation, filling missing ones with NaN
+    columns = EXPECTED_COLUMNS + ['image_url'] if keep_image_url else EXPECTED_COLUMNS
+    df = df.reindex(columns=columns)
 
-        # Ensure all expected columns exist right after creation, filling missing ones with NaN
-        df = df.reindex(columns=expected_columns)
+    # --- Data Cleaning and Transformation ---
+    df['title'] = df['title'].str.strip()
+    df['gender'] = df['gender'].str.strip()
+    df = df.dropna(subset=['title', 'gender'])
+    df = df[df['title'] != 'Unknown Product']
 
-        # --- Data Cleaning and Transformation ---
-        df['title'] = df['title'].str.strip()
-        df['gender'] = df['gender'].str.strip()
-        df = df.dropna(subset=['title', 'gender'])
-        df = df[df['title'] != 'Unknown Product']
+    df['price'] = parse_price_column(df['price']) * 16000
+    df['rating'] = parse_rating_column(df['rating'])
+    df['colors'] = parse_colors_column(df['colors'])
 
-        df['price'] = pd.to_numeric(
-            df['price'], errors='coerce').fillna(0) * 16000
+    if fill:
+        df = fill_missing(df)
 
-        df['rating'] = pd.to_numeric(df['rating'], errors='coerce').fillna(0.0)
-        df['colors'] = pd.to_numeric(
-            df['colors'], errors='coerce').fillna(1).astype(int)
+    df['timestamp'] = timestamp or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    return df
 
-        df['size'] = df['size'].fillna('One Size')
 
-        df['timestamp'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+def transform_data(raw_data, keep_image_url=False, fill=True, timestamp=None):
+    """
+    Transform the raw product data into a cleaned and structured DataFrame.
 
-        # Drop duplicates after all cleaning
-        df = df.drop_duplicates(subset=['title', 'price', 'size', 'gender'])
+    Pass `fill=False` to validate the parsed values before fill_missing
+    replaces the gaps, and `timestamp` to stamp rows with something other
+    than the current time (e.g. a replayed run's fetch time).
+    """
+    logger.info("Starting data transformation")
 
-        logger.info(f"Final data shape: {df.shape}")
-        return df
+    expected_columns = EXPECTED_COLUMNS
 
-    except Exception as e:
-        logger.error(f"An error occurred during data transformation: {e}")
+    if not raw_data or len(raw_data) == 0:
+        logger.warning("No data to transform")
         return pd.DataFrame(columns=expected_columns)
+
+    df = clean_frame(raw_frame(raw_data), timestamp, keep_image_url, fill)
+
+    # Drop duplicates after all cleaning
+    df = df.drop_duplicates(subset=DEDUP_SUBSET)
+
+    logger.info(f"Final data shape: {df.shape}")
+    return df
@@ -0,0 +1,69 @@
+import logging
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_SIZES = ('XS', 'S', 'M', 'L', 'XL', 'XXL', 'One Size')
+ALLOWED_GENDERS = ('Men', 'Women', 'Unisex')
+# Prices are in rupiah after transform_data's conversion.
+MIN_PRICE = 0
+MAX_PRICE = 100_000_000
+
+# A rule passes a row when `check(data)` is True for it. Checks work on whole
+# columns and must return a boolean Series aligned with the frame.
+Rule = namedtuple('Rule', ['name', 'check'])
+
+
+def in_range(column, low, high, include_low=True):
+    def check(data):
+        values = pd.to_numeric(data[column], errors='coerce')
+        above = values >= low if include_low else values > low
+        return above & (values <= high)
+    return check
+
+
+def one_of(column, allowed):
+    def check(data):
+        return data[column].isin(allowed)
+    return check
+
+
+RULES = [
+    Rule('price_range', in_range('price', MIN_PRICE, MAX_PRICE, include_low=False)),
+    Rule('rating_range', in_range('rating', 0, 5)),
+    Rule('colors_positive', in_range('colors', 1, np.inf)),
+    Rule('size_allowed', one_of('size', ALLOWED_SIZES)),
+    Rule('gender_allowed', one_of('gender', ALLOWED_GENDERS)),
+]
+
+
+def validate_data(data: pd.DataFrame, rules=RULES):
+    """
+    Split a transformed frame into valid and quarantined rows.
+
+    Every rule is evaluated as a column mask over the whole frame, so the
+    cost is a handful of vectorized passes regardless of row count.
+    Quarantined rows get a `failed_rules` column listing the rules they
+    broke. Returns (valid, quarantined, per-rule failure counts).
+    """
+    failures = pd.DataFrame(
+        {rule.name: ~rule.check(data).fillna(False).astype(bool) for rule in rules},
+        index=data.index)
+    bad = failures.any(axis=1).to_numpy()
+    counts = {name: int(count) for name, count in failures.sum().items()}
+
+    quarantined = data[bad].copy()
+    failed_rules = pd.Series('', index=quarantined.index, dtype=object)
+    for name in failures.columns:
+        failed = failures.loc[bad, name]
+        failed_rules = failed_rules.where(~failed, failed_rules + name + ',')
+    quarantined['failed_rules'] = failed_rules.str.rstrip(',')
+
+    if bad.any():
+        logger.warning(
+            f"Quarantined {int(bad.sum())} of {len(data)} rows: "
+            + ', '.join(f"{name}={count}" for name, count in counts.items() if count))
+    return data[~bad], quarantined, counts